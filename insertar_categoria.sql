@@ -1,3 +1,4 @@
+-- Después de ejecutar este script: python manage.py reconstruir_arbol_categorias
 -- Primero: eliminar datos existentes (opcional, para reiniciar)
 DELETE FROM tienda_categoria;
 DELETE FROM sqlite_sequence WHERE name = 'tienda_categoria';
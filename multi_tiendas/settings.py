@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'tienda.middleware.InstrumentacionMiddleware',  # Solo activa con INSTRUMENTACION
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,9 +80,56 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+IMAGENES_HILOS = 2  # Hilos que generan las miniaturas de productos (tienda/imagenes.py)
+
+# Importación masiva de productos (tienda/importacion.py)
+IMPORTACION_LOTE = 500  # Filas por SELECT/bulk_create/bulk_update
+IMPORTACION_MAX_BYTES_IMAGEN = 10 * 1024 * 1024
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché de PDFs de órdenes (fuera de MEDIA_ROOT: no debe servirse públicamente)
+PDF_CACHE_DIR = BASE_DIR / 'cache' / 'pdf'
+PDF_CACHE_MAX_BYTES = 500 * 1024 * 1024  # 500 MB
+PDF_CACHE_MAX_DIAS = 30
+# Exportación masiva: procesos por exportación y exportaciones a la vez por worker web
+PDF_PROCESOS = 2
+PDF_EXPORTACIONES_SIMULTANEAS = 1
+
+# Paginación por keyset de los listados de productos
+PAGINACION_TAMANO = 24
+PAGINACION_TAMANO_MAX = 100
+PRECIOS_POR_PAGINA = 200  # Productos por página en la asignación masiva de precios
+
+# Caché (roles de usuario, ...). LocMemCache es por proceso: con varios workers
+# usa una caché compartida para que las invalidaciones lleguen a todos, p. ej.:
+# CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'multi-tiendas',
+    }
+}
+ROLES_CACHE_SEGUNDOS = 3600
+# Fragmentos del catálogo: sus claves llevan la versión del catálogo (tabla
+# VersionCatalogo, compartida por todos los procesos), así que se invalidan al
+# cambiar productos/categorías/stock aunque la caché sea por proceso
+CATALOGO_CACHE_SEGUNDOS = 300
+CATALOGO_API_MAX_AGE = 60  # Cache-Control de /api/catalogo/ (navegadores y proxy inverso)
+
+# Métricas por petición (consultas, SQL, plantillas) en Server-Timing y en /admin/rendimiento/
+INSTRUMENTACION = os.getenv('INSTRUMENTACION', '') == '1'
+INSTRUMENTACION_MUESTRAS = 500  # Peticiones recientes guardadas por URL
+INSTRUMENTACION_REPETIDAS = 50  # Firmas SQL repetidas guardadas por URL
+
+# Bloqueo de login: 5 fallos por usuario (20 por IP) en 2 horas → 2 horas bloqueado.
+# 'tienda.limitador.LimitadorBD' usa la tabla LoginAttempt si no hay caché compartida.
+LOGIN_LIMITADOR = 'tienda.limitador.LimitadorCache'
+LOGIN_MAX_INTENTOS = 5
+LOGIN_MAX_INTENTOS_IP = 20
+LOGIN_VENTANA_SEGUNDOS = 2 * 3600
+LOGIN_BLOQUEO_SEGUNDOS = 2 * 3600
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 
@@ -99,7 +147,11 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 DEFAULT_FROM_EMAIL = 'no-reply@multitiendas.com'
 
-# Sesión: cerrar tras 5 minutos de inactividad
-SESSION_COOKIE_AGE = 300  # 600 segundos = 10 minutos
-SESSION_SAVE_EVERY_REQUEST = True  # Renueva la sesión con cada petición
+# Sesión: cerrar tras 5 minutos de inactividad (lo controla SessionTimeoutMiddleware)
+SESSION_INACTIVIDAD_SEGUNDOS = 300
+# La actividad solo se guarda si la anterior tiene más de N segundos: el cierre
+# por inactividad tiene esa precisión, a cambio de no escribir la sesión en cada petición
+SESSION_ACTIVIDAD_GRANULARIDAD = 60
+SESSION_COOKIE_AGE = SESSION_INACTIVIDAD_SEGUNDOS + SESSION_ACTIVIDAD_GRANULARIDAD
+SESSION_SAVE_EVERY_REQUEST = False
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Opcional: cerrar al cerrar navegador
\ No newline at end of file
@@ -0,0 +1,121 @@
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+
+from .busqueda import buscar_productos
+from .catalogo import fragmento, version_catalogo
+from .models import Categoria, Producto
+from .paginacion import paginar_keyset, tamano_pagina
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# Campo público → ruta en el ORM. Solo lo que ya ve un comprador (nunca el costo).
+CAMPOS = {
+    'id': 'id',
+    'sku': 'sku',
+    'nombre': 'nombre',
+    'descripcion': 'descripcion',
+    'precio': 'precio',
+    'cantidad': 'cantidad',
+    'categoria_id': 'categoria_id',
+    'categoria': 'categoria__ruta',
+    'imagen': 'imagen',
+    'creado': 'created_at',
+}
+CAMPOS_POR_DEFECTO = ('id', 'nombre', 'precio', 'cantidad', 'categoria_id', 'imagen')
+
+
+class ErrorConsulta(ValueError):
+    """Parámetros de la API inválidos (se responde 400)."""
+
+
+def parametros_catalogo(request):
+    """Parámetros normalizados de ?campos=&categoria=&q=&despues=&antes=&tamano= (memo en el request)."""
+    memo = getattr(request, '_parametros_catalogo', None)
+    if memo is not None:
+        return memo
+
+    campos = tuple(c.strip() for c in request.GET.get('campos', '').split(',') if c.strip()) or CAMPOS_POR_DEFECTO
+    desconocidos = [c for c in campos if c not in CAMPOS]
+    if desconocidos:
+        raise ErrorConsulta(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(CAMPOS)}.")
+    categoria = request.GET.get('categoria', '').strip()
+    if categoria and not categoria.isdigit():
+        raise ErrorConsulta("'categoria' debe ser un id numérico.")
+
+    memo = request._parametros_catalogo = (
+        tuple(dict.fromkeys(campos)),  # Sin repetidos, en el orden pedido
+        categoria or None,
+        request.GET.get('q', '').strip(),
+        request.GET.get('despues'),
+        request.GET.get('antes'),
+        tamano_pagina(request),
+    )
+    return memo
+
+
+def _por_defecto(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)  # Sin pasar por float: "12.50" llega tal cual
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def a_json(datos):
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto)
+    return json.dumps(datos, default=_por_defecto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _consultar(request, campos, categoria, q):
+    productos = Producto.objects.filter(cantidad__gt=0, visible_para_usuario=True)
+    orden = ('-created_at', '-id')
+    if q:
+        productos = buscar_productos(productos, q)
+        orden = ('-relevancia', *orden)
+    if categoria:
+        productos = productos.filter(categoria_id__in=Categoria.ids_subarbol(categoria))
+
+    # Diccionarios con .values(): ni instancias de Producto ni plantillas.
+    # Las columnas del orden se piden siempre porque el cursor sale de ellas.
+    directos = {CAMPOS[c] for c in campos if '__' not in CAMPOS[c]} | {c.lstrip('-') for c in orden}
+    # Los campos de otras tablas van con alias: 'categoria' chocaría con la FK
+    alias = {f'api_{c}': F(CAMPOS[c]) for c in campos if '__' in CAMPOS[c]}
+    pagina = paginar_keyset(productos.values(*directos, **alias), request, orden=orden)
+
+    resultados = []
+    for fila in pagina.objetos:
+        item = {c: fila[f'api_{c}' if '__' in CAMPOS[c] else CAMPOS[c]] for c in campos}
+        if item.get('imagen'):
+            item['imagen'] = default_storage.url(item['imagen'])
+        elif 'imagen' in item:
+            item['imagen'] = None
+        resultados.append(item)
+    return {
+        'resultados': resultados,
+        'siguiente': pagina.cursor_siguiente,
+        'anterior': pagina.cursor_anterior,
+    }
+
+
+def cuerpo_catalogo(request):
+    """
+    (json, json comprimido con gzip) de la página pedida. Se guardan ya
+    codificados en la caché por versión del catálogo: un acierto solo lee la
+    versión y no serializa nada.
+    """
+    campos, categoria, q, *_ = parametros = parametros_catalogo(request)
+
+    def generar():
+        cuerpo = a_json(_consultar(request, campos, categoria, q))
+        return cuerpo, gzip.compress(cuerpo, compresslevel=6, mtime=0)
+
+    return fragmento(version_catalogo(request), 'api', parametros, generar)
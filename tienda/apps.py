@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class TiendaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'tienda'
\ No newline at end of file
+    name = 'tienda'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(_asegurar_busqueda, sender=self)
+
+
+def _asegurar_busqueda(sender, using='default', **kwargs):
+    from .busqueda import asegurar_indice_sqlite
+    asegurar_indice_sqlite(using)
\ No newline at end of file
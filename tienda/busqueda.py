@@ -0,0 +1,111 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Producto
+
+# Configuración de texto completo (español + sin tildes) creada en la migración 0002
+CONFIG_POSTGRES = 'es_unaccent'
+TABLA_FTS_SQLITE = 'tienda_producto_fts'
+
+
+def buscar_productos(productos, texto):
+    """
+    Filtra `productos` por `texto` y anota `relevancia` (mayor = más relevante).
+
+    - PostgreSQL: columna `busqueda` (tsvector generado) + índice GIN.
+    - SQLite: tabla espejo FTS5 mantenida con triggers.
+    - Otros motores: icontains, sin ranking.
+    """
+    tabla = Producto._meta.db_table
+    vendor = connections[productos.db].vendor
+    terminos = re.findall(r'\w+', texto)
+
+    if vendor == 'postgresql' and terminos:
+        consulta = f"websearch_to_tsquery('{CONFIG_POSTGRES}', %s)"
+        return productos.filter(
+            RawSQL(f'"{tabla}"."busqueda" @@ {consulta}', [texto], output_field=BooleanField())
+        ).annotate(
+            relevancia=RawSQL(f'ts_rank_cd("{tabla}"."busqueda", {consulta})', [texto], output_field=FloatField())
+        )
+
+    if vendor == 'sqlite' and terminos:
+        # Cada término como prefijo: "zapato"* encuentra también "zapatos"
+        consulta = ' '.join(f'"{t}"*' for t in terminos)
+        return productos.filter(
+            id__in=RawSQL(
+                f'SELECT rowid FROM {TABLA_FTS_SQLITE} WHERE {TABLA_FTS_SQLITE} MATCH %s', [consulta]
+            )
+        ).annotate(
+            # bm25() devuelve valores negativos (menor = mejor); se invierte el signo
+            relevancia=RawSQL(
+                f'SELECT -bm25({TABLA_FTS_SQLITE}, 10.0, 1.0) FROM {TABLA_FTS_SQLITE} '
+                f'WHERE {TABLA_FTS_SQLITE} MATCH %s AND rowid = "{tabla}"."id"',
+                [consulta], output_field=FloatField()
+            )
+        )
+
+    return productos.filter(
+        Q(nombre__icontains=texto) | Q(descripcion__icontains=texto)
+    ).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+
+# ===== ÍNDICE FTS5 (SQLite) =====
+
+_TRIGGERS_SQLITE = {
+    f'{TABLA_FTS_SQLITE}_ai': """
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {fts}(rowid, nombre, descripcion)
+            VALUES (new.id, new.nombre, coalesce(new.descripcion, ''));
+        END
+    """,
+    f'{TABLA_FTS_SQLITE}_ad': """
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, coalesce(old.descripcion, ''));
+        END
+    """,
+    f'{TABLA_FTS_SQLITE}_au': """
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nombre, descripcion ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, coalesce(old.descripcion, ''));
+            INSERT INTO {fts}(rowid, nombre, descripcion)
+            VALUES (new.id, new.nombre, coalesce(new.descripcion, ''));
+        END
+    """,
+}
+
+
+def asegurar_indice_sqlite(using='default'):
+    """
+    Crea (si faltan) la tabla FTS5 y sus triggers.
+
+    Se ejecuta tras cada `migrate`: SQLite reconstruye la tabla de productos en
+    algunos ALTER TABLE y con ello se pierden los triggers. Si faltaba alguno,
+    el índice se regenera desde la tabla de productos.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    tabla = Producto._meta.db_table
+    with connection.cursor() as cursor:
+        if tabla not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS_SQLITE} USING fts5("
+            f"nombre, descripcion, content='{tabla}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s)"
+            % ', '.join(['%s'] * len(_TRIGGERS_SQLITE)),
+            list(_TRIGGERS_SQLITE),
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        if existentes == set(_TRIGGERS_SQLITE):
+            return
+        for sql in _TRIGGERS_SQLITE.values():
+            cursor.execute(sql.format(fts=TABLA_FTS_SQLITE, tabla=tabla))
+        cursor.execute(f"INSERT INTO {TABLA_FTS_SQLITE}({TABLA_FTS_SQLITE}) VALUES ('rebuild')")
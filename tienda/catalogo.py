@@ -0,0 +1,73 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.template.backends.utils import csrf_input
+from django.utils.safestring import mark_safe
+
+from .models import VersionCatalogo
+
+# Los fragmentos cacheados llevan esta marca en lugar de {% csrf_token %}:
+# el token es de cada usuario y se inserta al servir la página
+MARCADOR_CSRF = mark_safe('<!--tienda:csrf-->')
+
+
+def version_catalogo(request=None):
+    """
+    Versión actual del catálogo, leída de la fila única de VersionCatalogo (una
+    consulta por clave primaria, memorizada en `request`). Vive en la BD y no en
+    la caché para que los cambios hechos por cualquier proceso (otro worker,
+    limpiar_carritos --loop, importar_productos...) lleguen a todos.
+    Si la fila no existe se crea con la hora en microsegundos: siempre mayor que
+    cualquier versión anterior, así nunca se reutilizan fragmentos viejos de una
+    caché compartida.
+    """
+    version = getattr(request, '_version_catalogo', None)
+    if version is not None:
+        return version
+    version = VersionCatalogo.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        version = VersionCatalogo.objects.get_or_create(pk=1, defaults={'version': time.time_ns() // 1000})[0].version
+    if request is not None:
+        request._version_catalogo = version
+    return version
+
+
+def _incrementar_version():
+    # UPDATE en autocommit tras el commit: la fila no queda bloqueada durante
+    # las transacciones de stock, que la tocarían todas
+    if not VersionCatalogo.objects.filter(pk=1).update(version=F('version') + 1):
+        version_catalogo()  # La fila no existía: se crea con una versión nueva
+
+
+def invalidar_catalogo():
+    """
+    Descarta todos los fragmentos del catálogo (productos y menú de categorías).
+    Dentro de una transacción espera al commit: si se invalidara antes, otra
+    petición podría cachear los datos viejos con la versión nueva.
+    """
+    transaction.on_commit(_incrementar_version)
+
+
+def fragmento(version, nombre, partes, generar):
+    """
+    Valor cacheado de `nombre` para (version, *partes); si falta, se calcula con
+    generar() y se guarda CATALOGO_CACHE_SEGUNDOS.
+    """
+    huella = hashlib.md5(repr(partes).encode(), usedforsecurity=False).hexdigest()
+    clave = f'tienda:catalogo:{version}:{nombre}:{huella}'
+    valor = cache.get(clave)
+    if valor is None:
+        valor = generar()
+        cache.set(clave, valor, getattr(settings, 'CATALOGO_CACHE_SEGUNDOS', 300))
+    return valor
+
+
+def insertar_csrf(html, request):
+    """Sustituye MARCADOR_CSRF por el campo csrfmiddlewaretoken del usuario actual."""
+    if MARCADOR_CSRF not in html:
+        return mark_safe(html)
+    return mark_safe(html.replace(MARCADOR_CSRF, str(csrf_input(request))))
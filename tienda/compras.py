@@ -0,0 +1,79 @@
+import uuid
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from .inventario import vaciar_carrito
+from .models import Carrito, ItemOrden, Orden
+from .reportes import registrar_ventas
+
+
+class CarritoVacio(Exception):
+    """El carrito no tiene ítems que comprar."""
+
+
+def nuevo_token():
+    """Token de idempotencia para el formulario de compra (uno por visita al carrito)."""
+    return uuid.uuid4().hex
+
+
+def importe_items(items):
+    """Total del carrito a partir de los ítems ya cargados con select_related('producto')."""
+    return sum((item.cantidad * item.producto.precio for item in items), Decimal('0.00'))
+
+
+def procesar_compra(usuario, token=None):
+    """
+    Convierte el carrito de `usuario` en una orden completada.
+
+    El carrito y después sus ítems se bloquean (SELECT ... FOR UPDATE) durante
+    toda la transacción, en el mismo orden que la limpieza de carritos: esta no
+    puede devolver al stock unidades que se están comprando. El total y los
+    precios se toman de las filas ya leídas y las líneas se insertan
+    con un solo bulk_create. Si `token` ya generó una orden (doble envío o
+    reintento), se devuelve esa orden sin crear otra.
+
+    Devuelve (orden, creada). Lanza CarritoVacio si no hay nada que comprar.
+    """
+    try:
+        with transaction.atomic():
+            carrito = Carrito.objects.select_for_update().filter(usuario=usuario).first()
+            if token:
+                # Tras el bloqueo: un envío concurrente con el mismo token ya ha confirmado
+                existente = Orden.objects.filter(usuario=usuario, token_idempotencia=token).first()
+                if existente:
+                    return existente, False
+            if carrito is None:
+                raise CarritoVacio
+            items = list(carrito.items.select_for_update(of=('self',)).select_related('producto'))
+            if not items:
+                raise CarritoVacio
+
+            orden = Orden.objects.create(
+                usuario=usuario,
+                total=importe_items(items),
+                total_lineas=len(items),
+                total_unidades=sum(item.cantidad for item in items),
+                created_by=usuario,
+                estado='completada',
+                token_idempotencia=token or None,
+            )
+            lineas = ItemOrden.objects.bulk_create([
+                ItemOrden(
+                    orden=orden,
+                    producto_nombre=item.producto.nombre,
+                    producto_id=item.producto_id,
+                    cantidad=item.cantidad,
+                    precio_unitario=item.producto.precio,
+                )
+                for item in items
+            ])
+            registrar_ventas(orden, lineas)
+            vaciar_carrito(carrito.id)
+            return orden, True
+    except IntegrityError:
+        # Sin carrito que bloquear dos envíos pueden llegar a la vez: gana el índice único
+        existente = Orden.objects.filter(usuario=usuario, token_idempotencia=token).first() if token else None
+        if existente is None:
+            raise
+        return existente, False
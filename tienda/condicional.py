@@ -0,0 +1,70 @@
+import hashlib
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from .api import ErrorConsulta, parametros_catalogo
+from .catalogo import version_catalogo
+from .models import Carrito, Orden
+from .pdf import clave_pdf
+from .roles import es_admin, es_almacenero
+
+# Validadores (ETag) para condition(): se calculan sin renderizar nada, solo
+# con consultas por clave primaria. Si no cambian, la vista responde
+# 304 sin tocar plantillas ni xhtml2pdf.
+
+PLANTILLAS_CATALOGO = (
+    'base.html', 'dashboard.html', 'dashboard_productos.html', 'dashboard_categorias.html',
+    'dashboard_filtro_categorias.html', 'paginacion.html',
+)
+PLANTILLAS_ORDEN = ('base.html', 'detalle_orden.html')
+
+
+def _huella(*partes):
+    return hashlib.sha256(':'.join(map(str, partes)).encode('utf-8')).hexdigest()[:32]
+
+
+def huella_plantillas(nombres):
+    """Cambia al desplegar plantillas nuevas: un 304 nunca sirve HTML de la versión anterior."""
+    return _huella(*(get_template(nombre).template.source for nombre in nombres))
+
+
+def etag_catalogo(request, *args, **kwargs):
+    user = request.user
+    if not request.GET and (es_admin(user) or es_almacenero(user)):
+        return None  # La vista redirige a su panel
+    # El HTML lleva el token CSRF: sin cookie aún, se renderiza para crearla
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if not csrf:
+        return None
+    num_items = Carrito.objects.filter(usuario_id=user.pk).values_list('num_items', flat=True).first() or 0
+    return _huella(
+        'catalogo', version_catalogo(request), user.pk, user.get_username(), num_items, csrf,
+        huella_plantillas(PLANTILLAS_CATALOGO),
+    )
+
+
+def etag_api_catalogo(request, *args, **kwargs):
+    # Una consulta por clave primaria: versión del catálogo + parámetros de la página
+    try:
+        parametros = parametros_catalogo(request)
+    except ErrorConsulta:
+        return None
+    return _huella('api', version_catalogo(request), *parametros)
+
+
+def _orden_del_usuario(request, orden_id):
+    return Orden.objects.filter(id=orden_id, usuario=request.user).only('id', 'estado', 'total').first()
+
+
+def etag_detalle_orden(request, orden_id):
+    # Las líneas y la fecha de una orden no cambian: basta con estado y total
+    orden = _orden_del_usuario(request, orden_id)
+    if orden is None:
+        return None  # La vista responde 404
+    return _huella('orden', orden.id, orden.estado, orden.total, huella_plantillas(PLANTILLAS_ORDEN))
+
+
+def etag_pdf_orden(request, orden_id):
+    orden = _orden_del_usuario(request, orden_id)
+    return clave_pdf(orden) if orden is not None else None
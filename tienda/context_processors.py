@@ -1,12 +1,12 @@
-from django.db.models import Sum
+from django.utils.functional import SimpleLazyObject
+from .models import Carrito
 
 def carrito_info(request):
-    total_items = 0
-    if request.user.is_authenticated:
-        # ✅ Recalcular SIEMPRE desde la BD (no caché)
-        carrito = getattr(request.user, 'carrito', None)
-        if carrito:
-            total_items = carrito.items.aggregate(
-                total=Sum('cantidad')
-            )['total'] or 0
-    return {'carrito_total_items': total_items}
\ No newline at end of file
+    def total_items():
+        if not request.user.is_authenticated:
+            return 0
+        # Contador desnormalizado: una consulta, y solo si la plantilla lo usa
+        return Carrito.objects.filter(usuario_id=request.user.pk).values_list(
+            'num_items', flat=True
+        ).first() or 0
+    return {'carrito_total_items': SimpleLazyObject(total_items)}
\ No newline at end of file
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from .models import Producto, Categoria
 from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
-from tienda.validators import PasswordStrengthValidator
+from tienda.validators import PasswordStrengthValidator, validar_fecha_vencimiento
 from django.core.exceptions import ValidationError
 
 class LoginForm(forms.Form):
@@ -63,10 +63,12 @@ class RegistroForm(forms.Form):
 class ProductoForm(forms.ModelForm):
     class Meta:
         model = Producto
-        fields = ['nombre', 'descripcion', 'cantidad', 'categoria', 'fecha_vencimiento', 'imagen']
+        fields = ['sku', 'nombre', 'descripcion', 'costo', 'cantidad', 'categoria', 'fecha_vencimiento', 'imagen']
         widgets = {
+            'sku': forms.TextInput(attrs={'class': 'form-control'}),
             'nombre': forms.TextInput(attrs={'class': 'form-control'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+            'costo': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'step': '0.01'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'categoria': forms.Select(attrs={'class': 'form-control'}),
             'fecha_vencimiento': forms.DateInput(attrs={
@@ -83,10 +85,25 @@ class ProductoForm(forms.ModelForm):
 
     def clean_fecha_vencimiento(self):
         fecha = self.cleaned_data.get('fecha_vencimiento')
-        if fecha and fecha < timezone.now().date():
-            raise forms.ValidationError("La fecha de vencimiento no puede ser anterior al día de hoy.")
+        validar_fecha_vencimiento(fecha)
         return fecha
     
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        help_text="CSV o XLSX con las columnas sku, nombre, descripcion, costo, cantidad, categoria, fecha_vencimiento, imagen.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    imagenes = forms.FileField(
+        required=False,
+        help_text="ZIP con las imágenes que nombra la columna 'imagen' (opcional).",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.zip'})
+    )
+    reemplazar_stock = forms.BooleanField(
+        required=False,
+        help_text="Si se marca, la cantidad de los SKU existentes reemplaza al stock en lugar de sumarse."
+    )
+
+
 # tienda/forms.py (añade al final)
 
 class AdminCrearUsuarioForm(forms.Form):
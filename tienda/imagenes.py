@@ -0,0 +1,139 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .catalogo import invalidar_catalogo
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+# nombre → (ancho, alto, recortar). "thumb" se recorta al cuadrado (tablas);
+# el resto conserva la proporción y nunca se amplía.
+RENDICIONES = {
+    'thumb': (120, 120, True),
+    'card': (480, 480, False),
+    'full': (1200, 1200, False),
+}
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_pool = None
+
+
+def _obtener_pool():
+    # Pillow suelta el GIL al decodificar/redimensionar/codificar: con hilos basta
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGENES_HILOS', 2),
+            thread_name_prefix='rendiciones',
+        )
+    return _pool
+
+
+def programar_rendiciones(producto):
+    """Genera las rendiciones de la imagen del producto en segundo plano, tras el commit."""
+    if not producto.imagen:
+        _borrar_rendiciones(producto.imagen_rendiciones)
+        Producto.objects.filter(pk=producto.pk).update(imagen_rendiciones={})
+        return
+    producto_id, nombre = producto.pk, producto.imagen.name
+    transaction.on_commit(lambda: _obtener_pool().submit(_generar_en_hilo, producto_id, nombre))
+
+
+def _generar_en_hilo(producto_id, nombre):
+    try:
+        generar_rendiciones(producto_id, nombre)
+    except Exception:
+        logger.exception("No se pudieron generar las rendiciones de %s", nombre)
+    finally:
+        close_old_connections()
+
+
+def _redimensionar(original, ancho, alto, recortar):
+    if recortar:
+        return ImageOps.fit(original, (ancho, alto), Image.Resampling.LANCZOS)
+    imagen = original.copy()
+    imagen.thumbnail((ancho, alto), Image.Resampling.LANCZOS)
+    return imagen
+
+
+def _codificar(imagen, formato):
+    tipo, opciones = FORMATOS[formato]
+    if tipo == 'JPEG' and imagen.mode != 'RGB':
+        fondo = Image.new('RGB', imagen.size, 'white')
+        con_alfa = imagen.convert('RGBA')
+        fondo.paste(con_alfa, mask=con_alfa.getchannel('A'))
+        imagen = fondo
+    elif tipo == 'WEBP' and imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+    salida = BytesIO()
+    imagen.save(salida, tipo, **opciones)
+    return salida.getvalue()
+
+
+def generar_rendiciones(producto_id, nombre):
+    """
+    Crea las rendiciones de la imagen `nombre` y las registra en
+    Producto.imagen_rendiciones = {'origen': nombre, 'tamanos': {rendicion: {'ancho', 'webp', 'jpeg'}}}.
+    Si mientras tanto el producto cambió de imagen, se descartan.
+    """
+    with default_storage.open(nombre, 'rb') as archivo, Image.open(archivo) as original:
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    base = PurePosixPath(nombre)
+    directorio = base.parent / 'rendiciones'
+    tamanos, creados, por_tamano = {}, [], {}
+    for clave, (ancho, alto, recortar) in RENDICIONES.items():
+        imagen = _redimensionar(original, ancho, alto, recortar)
+        if imagen.size in por_tamano:
+            # Original pequeño: "full" sale igual que "card", se reutilizan sus archivos
+            tamanos[clave] = por_tamano[imagen.size]
+            continue
+        tamanos[clave] = por_tamano[imagen.size] = {'ancho': imagen.width}
+        for formato in FORMATOS:
+            ruta = str(directorio / f"{base.stem}_{clave}.{formato}")
+            default_storage.delete(ruta)
+            ruta = default_storage.save(ruta, ContentFile(_codificar(imagen, formato)))
+            tamanos[clave][formato] = ruta
+            creados.append(ruta)
+
+    rendiciones = {'origen': nombre, 'tamanos': tamanos}
+    with transaction.atomic():
+        producto = Producto.objects.select_for_update().filter(pk=producto_id, imagen=nombre).first()
+        if producto is None:
+            anteriores, actuales = {}, set()
+            for ruta in creados:
+                default_storage.delete(ruta)
+        else:
+            anteriores, actuales = producto.imagen_rendiciones, set(creados)
+            Producto.objects.filter(pk=producto_id).update(imagen_rendiciones=rendiciones)
+            invalidar_catalogo()  # La grilla ya puede servir el srcset
+    _borrar_rendiciones(anteriores, conservar=actuales)
+    return rendiciones
+
+
+def _borrar_rendiciones(rendiciones, conservar=()):
+    for datos in (rendiciones or {}).get('tamanos', {}).values():
+        for formato in FORMATOS:
+            ruta = datos.get(formato)
+            if ruta and ruta not in conservar:
+                default_storage.delete(ruta)
+
+
+def rendiciones_vigentes(producto):
+    """Tamaños generados para la imagen actual del producto ({} si aún no existen)."""
+    rendiciones = producto.imagen_rendiciones or {}
+    if not producto.imagen or rendiciones.get('origen') != producto.imagen.name:
+        return {}
+    return rendiciones.get('tamanos', {})
@@ -0,0 +1,379 @@
+import codecs
+import csv
+import itertools
+import zipfile
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from .catalogo import invalidar_catalogo
+from .imagenes import programar_rendiciones
+from .models import Categoria, Producto
+from .precios import limpiar_costo
+from .validators import validar_fecha_vencimiento
+
+try:
+    import openpyxl
+except ImportError:  # Opcional: sin openpyxl solo se aceptan CSV
+    openpyxl = None
+
+COLUMNAS = ('sku', 'nombre', 'descripcion', 'costo', 'cantidad', 'categoria', 'fecha_vencimiento', 'imagen')
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+
+class ErrorImportacion(Exception):
+    """El archivo entero no se puede importar (formato, cabecera, ZIP...)."""
+
+
+class ResultadoImportacion:
+    """Totales de una importación y los errores por fila: [(fila, sku, mensaje)]."""
+
+    def __init__(self):
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+
+    def error(self, fila, sku, mensaje):
+        self.errores.append((fila, sku or '', mensaje))
+
+    @property
+    def importados(self):
+        return self.creados + self.actualizados
+
+
+# ===== LECTURA DEL ARCHIVO =====
+
+def _filas_csv(archivo, codificacion):
+    # Línea a línea: el archivo nunca se carga entero en memoria
+    lineas = codecs.iterdecode(archivo, codificacion)
+    try:
+        primera = next(lineas, '')
+        try:
+            dialecto = csv.Sniffer().sniff(primera, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(itertools.chain([primera], lineas), dialecto)
+    except UnicodeDecodeError:
+        raise ErrorImportacion(f"El archivo no está codificado en {codificacion}.")
+    except csv.Error as e:
+        raise ErrorImportacion(f"CSV mal formado: {e}")
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ErrorImportacion("Para importar .xlsx hace falta instalar openpyxl; exporta la hoja como CSV.")
+    try:
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ErrorImportacion(f"No se pudo abrir el Excel: {e}")
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre, codificacion='utf-8-sig'):
+    """
+    Abre un CSV o XLSX y devuelve (columnas, filas), donde `filas` genera
+    (número de fila, {columna: valor}) a medida que se lee el archivo.
+    """
+    extension = PurePosixPath(nombre).suffix.lower()
+    if extension == '.xlsx':
+        filas = _filas_xlsx(archivo)
+    elif extension in ('.csv', '.txt'):
+        filas = _filas_csv(archivo, codificacion)
+    else:
+        raise ErrorImportacion("Formato no soportado: sube un archivo .csv o .xlsx.")
+
+    cabecera = next(filas, None)
+    if not cabecera:
+        raise ErrorImportacion("El archivo está vacío.")
+    columnas = [str(c or '').strip().lower().replace(' ', '_') for c in cabecera]
+    if 'sku' not in columnas:
+        raise ErrorImportacion(f"Falta la columna 'sku'. Columnas reconocidas: {', '.join(COLUMNAS)}.")
+
+    def generar():
+        for numero, valores in enumerate(filas, start=2):
+            if any(v not in (None, '') and str(v).strip() for v in valores):  # Se saltan las filas vacías
+                yield numero, dict(zip(columnas, valores))
+
+    return [c for c in columnas if c in COLUMNAS], generar()
+
+
+# ===== VALIDACIÓN =====
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # Excel guarda los códigos numéricos como 1234.0
+    return str(valor).strip()
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise ValidationError(f"Fecha de vencimiento no válida: '{valor}' (usa AAAA-MM-DD o DD/MM/AAAA).")
+
+
+def mapa_categorias():
+    """{nombre o ruta en minúsculas: id} de las categorías asignables (las que tienen padre)."""
+    mapa = {}
+    for id_, nombre, ruta in Categoria.objects.filter(padre__isnull=False).values_list('id', 'nombre', 'ruta'):
+        mapa[nombre.casefold()] = id_
+        if ruta:
+            mapa[ruta.casefold()] = id_
+    return mapa
+
+
+def limpiar_fila(datos, categorias):
+    """
+    Valida una fila con las mismas reglas que ProductoForm. Devuelve
+    {campo: valor} solo con las columnas que traen valor; lanza ValidationError.
+    """
+    limpio, errores = {}, []
+    sku = _texto(datos.get('sku'))
+    if not sku:
+        errores.append("Falta el SKU.")
+    elif len(sku) > 64:
+        errores.append("El SKU no puede superar 64 caracteres.")
+    limpio['sku'] = sku
+
+    for campo, maximo in (('nombre', 100), ('descripcion', None)):
+        valor = _texto(datos.get(campo))
+        if maximo and len(valor) > maximo:
+            errores.append(f"El {campo} no puede superar {maximo} caracteres.")
+        elif valor:
+            limpio[campo] = valor
+
+    cantidad = _texto(datos.get('cantidad'))
+    if cantidad:
+        try:
+            limpio['cantidad'] = int(cantidad)
+            if limpio['cantidad'] < 0:
+                raise ValueError
+        except ValueError:
+            errores.append(f"Cantidad no válida: '{cantidad}'.")
+
+    costo = _texto(datos.get('costo'))
+    if costo:
+        try:
+            limpio['costo'] = limpiar_costo(costo)
+        except ValidationError as e:
+            errores.append(f"Costo: {e.messages[0]}")
+
+    categoria = _texto(datos.get('categoria'))
+    if categoria:
+        categoria_id = categorias.get(' '.join(categoria.split()).casefold())
+        if categoria_id is None:
+            errores.append(f"Categoría desconocida: '{categoria}'.")
+        limpio['categoria_id'] = categoria_id
+
+    fecha = datos.get('fecha_vencimiento')
+    if fecha not in (None, '') and _texto(fecha):
+        try:
+            limpio['fecha_vencimiento'] = _fecha(fecha if isinstance(fecha, date) else _texto(fecha))
+            validar_fecha_vencimiento(limpio['fecha_vencimiento'])
+        except ValidationError as e:
+            errores.extend(e.messages)
+
+    imagen = _texto(datos.get('imagen'))
+    if imagen:
+        limpio['imagen'] = imagen
+
+    if errores:
+        raise ValidationError(errores)
+    return limpio
+
+
+# ===== IMÁGENES =====
+
+class ImagenesZip:
+    """Imágenes de un ZIP, buscadas por ruta o por nombre de archivo; cada una se guarda una sola vez."""
+
+    def __init__(self, archivo):
+        try:
+            self.zip = zipfile.ZipFile(archivo)
+        except (zipfile.BadZipFile, OSError):
+            raise ErrorImportacion("El archivo de imágenes no es un ZIP válido.")
+        self.entradas = {}
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                self.entradas.setdefault(info.filename.casefold(), info)
+                self.entradas.setdefault(PurePosixPath(info.filename).name.casefold(), info)
+        self.guardadas = {}
+        self.del_lote = []  # Guardadas desde el último lote confirmado
+        self.max_bytes = getattr(settings, 'IMPORTACION_MAX_BYTES_IMAGEN', 10 * 1024 * 1024)
+
+    def guardar(self, nombre):
+        """Guarda la imagen en el storage (productos/) y devuelve su nombre; ValidationError si no sirve."""
+        info = self.entradas.get(nombre.casefold()) or self.entradas.get(PurePosixPath(nombre).name.casefold())
+        if info is None:
+            raise ValidationError(f"La imagen '{nombre}' no está en el ZIP.")
+        if info.filename in self.guardadas:
+            return self.guardadas[info.filename]
+        if info.file_size > self.max_bytes:
+            raise ValidationError(f"La imagen '{nombre}' supera {self.max_bytes // (1024 * 1024)} MB.")
+        datos = self.zip.read(info)
+        try:
+            with Image.open(BytesIO(datos)) as imagen:
+                imagen.verify()
+        except Exception:
+            raise ValidationError(f"'{nombre}' no es una imagen válida.")
+        campo = Producto._meta.get_field('imagen')
+        ruta = default_storage.save(
+            campo.generate_filename(None, PurePosixPath(info.filename).name), ContentFile(datos)
+        )
+        self.guardadas[info.filename] = ruta
+        self.del_lote.append(info.filename)
+        return ruta
+
+    def confirmar_lote(self):
+        self.del_lote = []
+
+    def descartar_lote(self):
+        """Borra del storage las imágenes que guardó un lote que no se llegó a confirmar."""
+        for nombre in self.del_lote:
+            default_storage.delete(self.guardadas.pop(nombre))
+        self.del_lote = []
+
+    def cerrar(self):
+        self.zip.close()
+
+
+# ===== IMPORTACIÓN =====
+
+def importar_productos(archivo, usuario, nombre=None, imagenes=None, reemplazar_stock=False,
+                       lote=None, codificacion='utf-8-sig'):
+    """
+    Importa productos desde un CSV/XLSX con columnas sku, nombre, descripcion,
+    costo, cantidad, categoria, fecha_vencimiento e imagen (solo 'sku' es obligatoria).
+
+    Los SKU nuevos se crean (nombre y cantidad obligatorios) y los existentes se
+    actualizan con las columnas que traigan valor; la cantidad se suma al stock
+    salvo con `reemplazar_stock`. Se trabaja por lotes de `lote` filas: un SELECT
+    de los SKU existentes, un bulk_create y un bulk_update por cada combinación
+    de columnas con valor (las vacías no se tocan), cada lote en su propia
+    transacción. `imagenes` es un ZIP con los archivos que nombra la columna
+    'imagen'.
+
+    Las filas con errores no se importan y quedan en ResultadoImportacion.errores.
+    Lanza ErrorImportacion si el archivo entero no se puede leer.
+    """
+    lote = lote or getattr(settings, 'IMPORTACION_LOTE', 500)
+    _, filas = leer_filas(archivo, nombre or archivo.name, codificacion)
+    zip_imagenes = ImagenesZip(imagenes) if imagenes else None
+    categorias = mapa_categorias()
+    resultado = ResultadoImportacion()
+    vistos = {}
+    pendientes = []
+    try:
+        try:
+            for numero, datos in filas:
+                resultado.filas += 1
+                try:
+                    limpio = limpiar_fila(datos, categorias)
+                except ValidationError as e:
+                    resultado.error(numero, _texto(datos.get('sku')), ' '.join(e.messages))
+                    continue
+                if limpio['sku'] in vistos:
+                    resultado.error(numero, limpio['sku'], f"SKU repetido (ya aparece en la fila {vistos[limpio['sku']]}).")
+                    continue
+                vistos[limpio['sku']] = numero
+                pendientes.append((numero, limpio))
+                if len(pendientes) >= lote:
+                    _guardar_lote(pendientes, usuario, zip_imagenes, reemplazar_stock, resultado)
+                    pendientes = []
+        except ErrorImportacion as e:
+            # Los lotes anteriores ya están guardados: se informa dónde se cortó
+            resultado.error(None, '', f"Importación interrumpida: {e}")
+        if pendientes:
+            _guardar_lote(pendientes, usuario, zip_imagenes, reemplazar_stock, resultado)
+    finally:
+        if zip_imagenes:
+            zip_imagenes.cerrar()
+    return resultado
+
+
+def _guardar_lote(pendientes, usuario, zip_imagenes, reemplazar_stock, resultado):
+    # Solo id y sku: de los existentes se escriben únicamente los campos que trae cada fila
+    existentes = {
+        p.sku: p for p in Producto.objects.filter(sku__in=[d['sku'] for _, d in pendientes]).only('id', 'sku')
+    }
+
+    nuevos, con_imagen, guardables = [], [], []
+    actualizados = {}  # {campos que trae la fila: [productos]}, un bulk_update por grupo
+    ahora = timezone.now()
+    for numero, datos in pendientes:
+        producto = existentes.get(datos['sku'])
+        if producto is None and ('nombre' not in datos or 'cantidad' not in datos):
+            resultado.error(numero, datos['sku'], "SKU nuevo: el nombre y la cantidad son obligatorios.")
+            continue
+        if 'imagen' in datos:
+            if zip_imagenes is None:
+                resultado.error(numero, datos['sku'], "La fila trae imagen pero no se adjuntó el ZIP de imágenes.")
+                continue
+            try:
+                datos['imagen'] = zip_imagenes.guardar(datos['imagen'])
+            except ValidationError as e:
+                resultado.error(numero, datos['sku'], ' '.join(e.messages))
+                continue
+
+        if producto is None:
+            producto = Producto(**datos, usuario=usuario, created_by=usuario)
+            nuevos.append(producto)
+        else:
+            cantidad = datos.pop('cantidad', None)
+            for campo, valor in datos.items():
+                setattr(producto, campo, valor)
+            if cantidad is not None:
+                producto.cantidad = cantidad if reemplazar_stock else F('cantidad') + cantidad
+            producto.updated_by = usuario
+            producto.updated_at = ahora  # bulk_update no aplica auto_now
+            campos = [c for c in datos if c != 'sku'] + (['cantidad'] if cantidad is not None else [])
+            actualizados.setdefault(tuple(sorted(campos)), []).append(producto)
+        if 'imagen' in datos:
+            con_imagen.append(producto)
+        guardables.append((numero, datos['sku']))
+
+    try:
+        with transaction.atomic():
+            Producto.objects.bulk_create(nuevos, batch_size=500)
+            # Un campo vacío en la fila no se reescribe con lo leído antes del lote:
+            # así no se pisan reservas de stock ni cambios hechos entre medias
+            for campos, productos in actualizados.items():
+                Producto.objects.bulk_update(productos, [*campos, 'updated_by', 'updated_at'], batch_size=500)
+            for producto in con_imagen:
+                programar_rendiciones(producto)  # Se encolan al confirmar el lote
+            invalidar_catalogo()
+    except Exception as e:
+        # Las imágenes del lote ya están en el storage: sin sus productos quedarían huérfanas
+        if zip_imagenes:
+            zip_imagenes.descartar_lote()
+        if not isinstance(e, IntegrityError):
+            raise
+        # Otro proceso creó alguno de estos SKU a la vez: el lote entero se descarta
+        for numero, sku in guardables:
+            resultado.error(numero, sku, f"No se pudo guardar el lote: {e}")
+        return
+    if zip_imagenes:
+        zip_imagenes.confirmar_lote()
+    resultado.creados += len(nuevos)
+    resultado.actualizados += sum(len(productos) for productos in actualizados.values())
@@ -0,0 +1,191 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .catalogo import invalidar_catalogo
+from .models import Carrito, ItemCarrito, Producto
+
+
+class StockInsuficiente(ValueError):
+    """No hay stock suficiente para reservar la cantidad pedida."""
+
+
+# ===== RESERVA DE STOCK =====
+
+def reservar_stock(producto_id, cantidad):
+    """
+    Descuenta `cantidad` del stock con un único
+    UPDATE ... SET cantidad = cantidad - n WHERE id = ? AND cantidad >= n.
+    """
+    actualizados = Producto.objects.filter(
+        id=producto_id, cantidad__gte=cantidad
+    ).update(cantidad=F('cantidad') - cantidad)
+    if not actualizados:
+        _stock_insuficiente([producto_id])
+    invalidar_catalogo()  # El catálogo muestra el stock
+
+
+def liberar_stock(producto_id, cantidad):
+    """Devuelve `cantidad` unidades al stock del producto."""
+    Producto.objects.filter(id=producto_id).update(cantidad=F('cantidad') + cantidad)
+    invalidar_catalogo()
+
+
+def reservar_lote(cantidades):
+    """
+    Reserva varias cantidades ({producto_id: n}) en un solo UPDATE.
+    Si algún producto no alcanza, no se reserva nada.
+    """
+    cantidades = {pid: n for pid, n in cantidades.items() if n}
+    if not cantidades:
+        return
+    delta = _por_id(cantidades)
+    with transaction.atomic():
+        actualizados = Producto.objects.filter(
+            id__in=cantidades, cantidad__gte=delta
+        ).update(cantidad=F('cantidad') - delta)
+        if actualizados != len(cantidades):
+            _stock_insuficiente(cantidades, cantidades)
+        invalidar_catalogo()
+
+
+def devolver_lote(cantidades):
+    """Devuelve al stock varias cantidades ({producto_id: n}) en un solo UPDATE."""
+    cantidades = {pid: n for pid, n in cantidades.items() if n}
+    if not cantidades:
+        return 0
+    devueltos = Producto.objects.filter(id__in=cantidades).update(
+        cantidad=F('cantidad') + _por_id(cantidades)
+    )
+    invalidar_catalogo()
+    return devueltos
+
+
+def _por_id(cantidades):
+    return Case(
+        *[When(id=pid, then=Value(n)) for pid, n in cantidades.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _stock_insuficiente(producto_ids, pedidas=None):
+    # Solo en el camino de error: se consulta el stock para el mensaje
+    for nombre, pid, disponible in Producto.objects.filter(id__in=producto_ids).values_list('nombre', 'id', 'cantidad'):
+        if pedidas is None or disponible < pedidas[pid]:
+            raise StockInsuficiente(f"No hay suficiente stock para '{nombre}'. Disponible: {disponible}")
+    raise StockInsuficiente("El producto ya no está disponible.")
+
+
+# ===== OPERACIONES DE CARRITO =====
+# Orden de bloqueo en todas las operaciones: Carrito → ItemCarrito → Producto.
+# La compra y la limpieza de carritos siguen el mismo orden, así dos
+# transacciones nunca esperan una por la otra en sentidos opuestos.
+
+def _bloquear_carrito(carrito_id):
+    list(Carrito.objects.select_for_update().filter(pk=carrito_id).values_list('pk', flat=True))
+
+
+def agregar_item(carrito, producto, cantidad):
+    """Reserva el stock y suma `cantidad` al ítem del carrito (creándolo si no existe)."""
+    with transaction.atomic():
+        _bloquear_carrito(carrito.pk)
+        reservar_stock(producto.id, cantidad)
+        _sumar_al_contador(carrito.pk, cantidad)
+        items = ItemCarrito.objects.filter(carrito=carrito, producto=producto)
+        if items.update(cantidad=F('cantidad') + cantidad):
+            return
+        try:
+            with transaction.atomic():
+                ItemCarrito.objects.create(carrito=carrito, producto=producto, cantidad=cantidad)
+        except IntegrityError:
+            # Otra petición creó el ítem entre el UPDATE y el INSERT
+            items.update(cantidad=F('cantidad') + cantidad)
+
+
+def quitar_item(item):
+    """
+    Borra el ítem y devuelve su cantidad al stock. El DELETE es condicional a la
+    cantidad leída, así nunca se devuelve más (o menos) de lo reservado.
+    Devuelve False si el ítem cambió o ya no existía.
+    """
+    with transaction.atomic():
+        _bloquear_carrito(item.carrito_id)
+        borrados, _ = ItemCarrito.objects.filter(pk=item.pk, cantidad=item.cantidad).delete()
+        if not borrados:
+            return False
+        liberar_stock(item.producto_id, item.cantidad)
+        _sumar_al_contador(item.carrito_id, -item.cantidad)
+        return True
+
+
+def vaciar_carrito(carrito_id):
+    """Borra los ítems del carrito sin tocar el stock (p. ej. tras la compra)."""
+    ItemCarrito.objects.filter(carrito_id=carrito_id).delete()
+    Carrito.objects.filter(pk=carrito_id).update(num_items=0)
+
+
+def _sumar_al_contador(carrito_id, delta):
+    Carrito.objects.filter(pk=carrito_id).update(num_items=F('num_items') + delta)
+
+
+# ===== LIMPIEZA DE CARRITOS ABANDONADOS =====
+
+def liberar_items_vencidos(limite, lote=1000):
+    """
+    Borra los ítems de carrito agregados antes de `limite` y devuelve su stock,
+    en transacciones cortas de hasta `lote` carritos. Cada lote bloquea primero
+    los carritos con SELECT ... FOR UPDATE SKIP LOCKED (los que una compra o una
+    operación de carrito tiene bloqueados se dejan para la siguiente pasada),
+    después sus ítems vencidos, y se aplica con un UPDATE de productos, un
+    UPDATE de contadores y un DELETE.
+
+    Devuelve {'carritos', 'items', 'unidades'}.
+    """
+    carritos = items = unidades = 0
+    vencidos = ItemCarrito.objects.filter(agregado_en__lt=limite).values('carrito_id')
+    while True:
+        with transaction.atomic():
+            # Subconsulta y no JOIN: el FOR UPDATE solo alcanza a las filas de Carrito
+            carrito_ids = list(
+                Carrito.objects.select_for_update(skip_locked=True)
+                .filter(id__in=vencidos)
+                .order_by('id')
+                .values_list('id', flat=True)[:lote]
+            )
+            if not carrito_ids:
+                break
+            filas = list(
+                ItemCarrito.objects.select_for_update()
+                .filter(carrito_id__in=carrito_ids, agregado_en__lt=limite)
+                .order_by('id')
+                .values_list('id', 'carrito_id', 'producto_id', 'cantidad')
+            )
+            por_producto, por_carrito = {}, {}
+            for _, carrito_id, producto_id, cantidad in filas:
+                por_producto[producto_id] = por_producto.get(producto_id, 0) + cantidad
+                por_carrito[carrito_id] = por_carrito.get(carrito_id, 0) + cantidad
+            if filas:  # Vacío si una compra se llevó los ítems antes del bloqueo
+                ItemCarrito.objects.filter(id__in=[fila[0] for fila in filas]).delete()
+                devolver_lote(por_producto)
+                Carrito.objects.filter(id__in=por_carrito).update(
+                    num_items=Greatest(F('num_items') - _por_id(por_carrito), Value(0))
+                )
+
+        carritos += len(por_carrito)
+        items += len(filas)
+        unidades += sum(por_producto.values())
+        if len(carrito_ids) < lote:
+            break
+    return {'carritos': carritos, 'items': items, 'unidades': unidades}
+
+
+def items_vencidos(limite):
+    """Lo que liberaría liberar_items_vencidos(limite), en una sola consulta."""
+    resumen = ItemCarrito.objects.filter(agregado_en__lt=limite).aggregate(
+        carritos=Count('carrito_id', distinct=True),
+        items=Count('id'),
+        unidades=Sum('cantidad'),
+    )
+    resumen['unidades'] = resumen['unidades'] or 0
+    return resumen
@@ -0,0 +1,161 @@
+import hashlib
+import math
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import LoginAttempt
+
+
+def _config(nombre, por_defecto):
+    return getattr(settings, nombre, por_defecto)
+
+
+def ip_cliente(request):
+    # Detrás de un proxy, configúralo para que REMOTE_ADDR sea la IP real del cliente
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def obtener_limitador():
+    """Instancia el limitador configurado en LOGIN_LIMITADOR (por defecto, el de caché)."""
+    return import_string(_config('LOGIN_LIMITADOR', 'tienda.limitador.LimitadorCache'))()
+
+
+class Limitador(ABC):
+    """
+    Política: LOGIN_MAX_INTENTOS fallos de un usuario (o LOGIN_MAX_INTENTOS_IP
+    desde una IP) dentro de LOGIN_VENTANA_SEGUNDOS bloquean durante
+    LOGIN_BLOQUEO_SEGUNDOS. Por defecto 5 intentos / 2 horas, 20 por IP.
+    """
+
+    def __init__(self):
+        self.max_intentos = _config('LOGIN_MAX_INTENTOS', 5)
+        self.max_intentos_ip = _config('LOGIN_MAX_INTENTOS_IP', 20)
+        self.ventana = _config('LOGIN_VENTANA_SEGUNDOS', 2 * 3600)
+        self.duracion_bloqueo = _config('LOGIN_BLOQUEO_SEGUNDOS', 2 * 3600)
+
+    @abstractmethod
+    def bloqueo(self, username, ip):
+        """Devuelve (segundos de bloqueo restantes, bloqueado_por_ip); (0, False) si puede intentarlo."""
+
+    @abstractmethod
+    def registrar_fallo(self, username, ip):
+        """Anota un fallo. Devuelve los intentos que le quedan al usuario (0 = bloqueado) o None si no aplica."""
+
+    @abstractmethod
+    def registrar_exito(self, username, ip):
+        """Limpia los fallos del usuario tras un login correcto."""
+
+
+class LimitadorCache(Limitador):
+    """
+    Ventana deslizante aproximada en la caché (LOGIN_LIMITADOR_CACHE): ninguna
+    consulta a la BD. Los fallos se cuentan en dos cubos de una ventana (el
+    actual y el anterior) y el anterior pesa lo que le queda dentro de la
+    ventana deslizante: 4 fallos justo antes del cambio de cubo más 1 justo
+    después ya bloquean. Solo operaciones atómicas (add/incr), así los fallos
+    simultáneos desde una IP o contra un usuario se cuentan todos.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[_config('LOGIN_LIMITADOR_CACHE', 'default')]
+
+    def _clave(self, tipo, valor):
+        return f"tienda:login:{tipo}:{hashlib.sha256(valor.encode('utf-8')).hexdigest()[:32]}"
+
+    def bloqueo(self, username, ip):
+        ahora = time.time()
+        claves = {}
+        if username:
+            claves[self._clave('usuario', username) + ':bloqueo'] = 'usuario'
+        if ip:
+            claves[self._clave('ip', ip) + ':bloqueo'] = 'ip'
+        hasta = {claves[clave]: valor for clave, valor in self.cache.get_many(claves).items() if valor > ahora}
+        if not hasta:
+            return 0, False
+        return int(max(hasta.values()) - ahora) + 1, hasta.get('ip', 0) > hasta.get('usuario', 0)
+
+    def _cubos(self, clave, ahora):
+        cubo = int(ahora // self.ventana)
+        return f'{clave}:fallos:{cubo}', f'{clave}:fallos:{cubo - 1}'
+
+    def _incrementar(self, clave):
+        # Dos ventanas de vida: el cubo sigue contando mientras es "el anterior".
+        # incr falla si la clave expiró justo entre add e incr
+        for _ in range(2):
+            self.cache.add(clave, 0, 2 * self.ventana)
+            try:
+                return self.cache.incr(clave)
+            except ValueError:
+                pass
+        return 1
+
+    def _fallo(self, clave, maximo, ahora):
+        actual, anterior = self._cubos(clave, ahora)
+        fallos_actual = self._incrementar(actual)
+        peso_anterior = 1 - (ahora % self.ventana) / self.ventana
+        # Redondeo hacia arriba: ante la duda la aproximación bloquea antes, nunca después
+        fallos = math.ceil(round(fallos_actual + (self.cache.get(anterior) or 0) * peso_anterior, 6))
+        if fallos >= maximo:
+            # add y no set: los fallos que llegan ya bloqueados no alargan el bloqueo
+            self.cache.add(clave + ':bloqueo', ahora + self.duracion_bloqueo, self.duracion_bloqueo)
+            self.cache.delete_many([actual, anterior])
+            return 0
+        return maximo - fallos
+
+    def registrar_fallo(self, username, ip):
+        ahora = time.time()
+        if ip:
+            self._fallo(self._clave('ip', ip), self.max_intentos_ip, ahora)
+        if not username:
+            return None
+        return self._fallo(self._clave('usuario', username), self.max_intentos, ahora)
+
+    def registrar_exito(self, username, ip):
+        # Solo se limpia el usuario: un login válido no debe rehabilitar a una IP abusiva
+        clave = self._clave('usuario', username)
+        self.cache.delete_many([*self._cubos(clave, time.time()), clave + ':bloqueo'])
+
+
+class LimitadorBD(Limitador):
+    """
+    Alternativa sin caché compartida: usa la tabla LoginAttempt.
+    Solo limita por usuario (la tabla no guarda IPs) y solo usuarios existentes.
+    """
+
+    def bloqueo(self, username, ip):
+        if not username:
+            return 0, False
+        hasta = LoginAttempt.objects.filter(
+            user__username=username, blocked_until__gt=timezone.now()
+        ).values_list('blocked_until', flat=True).first()
+        if hasta is None:
+            return 0, False
+        return int((hasta - timezone.now()).total_seconds()) + 1, False
+
+    def registrar_fallo(self, username, ip):
+        user_id = User.objects.filter(username=username).values_list('id', flat=True).first()
+        if user_id is None:
+            return None
+        ahora = timezone.now()
+        with transaction.atomic():
+            attempt, _ = LoginAttempt.objects.select_for_update().get_or_create(user_id=user_id)
+            if attempt.last_attempt and attempt.last_attempt < ahora - timedelta(seconds=self.ventana):
+                attempt.attempts = 0  # Fuera de la ventana: se empieza de nuevo
+            attempt.attempts += 1
+            if attempt.attempts >= self.max_intentos:
+                attempt.attempts = 0
+                attempt.blocked_until = ahora + timedelta(seconds=self.duracion_bloqueo)
+            attempt.save()
+        return 0 if attempt.blocked_until and attempt.blocked_until > ahora else self.max_intentos - attempt.attempts
+
+    def registrar_exito(self, username, ip):
+        LoginAttempt.objects.filter(user__username=username).update(attempts=0, blocked_until=None)
\ No newline at end of file
@@ -0,0 +1,253 @@
+import json
+import os
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import resolve, reverse
+from django.utils import timezone
+from tienda.catalogo import invalidar_catalogo
+from tienda.models import Categoria, Producto
+
+CLAVE = 'benchmark-1234'
+BUSQUEDAS = ['choco', 'galleta', 'dulce', 'caramelo']
+
+
+def _percentil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def resumir(latencias):
+    ordenados = sorted(latencias)
+    return {
+        'n': len(ordenados),
+        'media_ms': round(sum(ordenados) / len(ordenados) * 1000, 2),
+        'p50_ms': round(_percentil(ordenados, 0.50) * 1000, 2),
+        'p95_ms': round(_percentil(ordenados, 0.95) * 1000, 2),
+        'p99_ms': round(_percentil(ordenados, 0.99) * 1000, 2),
+        'max_ms': round(ordenados[-1] * 1000, 2),
+    }
+
+
+def sembrar(productos, usuarios):
+    """Datos mínimos para el flujo de compra: categorías, productos con stock, compradores y un admin."""
+    clave = make_password(CLAVE)  # Un solo hash para todos: sembrar no mide PBKDF2
+    admin = User.objects.create(username='bench_admin', password=clave)
+    admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+    User.objects.bulk_create([User(username=f'bench_{i}', password=clave) for i in range(usuarios)])
+
+    raices = [Categoria.objects.create(nombre=f'Tipo {i}') for i in range(2)]
+    hojas = [Categoria.objects.create(nombre=f'Categoría {i}', padre=raices[i % 2]) for i in range(4)]
+    Producto.objects.bulk_create([
+        Producto(
+            nombre=f'{BUSQUEDAS[i % len(BUSQUEDAS)].capitalize()} {i}',
+            precio=Decimal(1 + i % 50),
+            cantidad=10 ** 6,
+            categoria=hojas[i % len(hojas)],
+            visible_para_usuario=True,
+            usuario=admin,
+            created_by=admin,
+        ) for i in range(productos)
+    ], batch_size=1000)
+    invalidar_catalogo()  # La caché puede ser compartida con la BD real
+    return list(Producto.objects.values_list('id', flat=True)), [c.id for c in hojas]
+
+
+class Medidor:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def medir(self, paso, funcion, *args, esperado=(200, 302), **kwargs):
+        inicio = time.perf_counter()
+        response = funcion(*args, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:  # El tiempo incluye generar todo el cuerpo
+                pass
+        duracion = time.perf_counter() - inicio
+        with self.lock:
+            self.latencias[paso].append(duracion)
+            if response.status_code not in esperado:
+                self.errores[paso] += 1
+        return response
+
+    def fallo(self, paso):
+        with self.lock:
+            self.errores[paso] += 1
+
+
+class Command(BaseCommand):
+    help = 'Mide el flujo de compra (login → búsqueda → carrito → compra → PDF) y los reportes con clientes concurrentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Clientes simultáneos (hilos)')
+        parser.add_argument('--iteraciones', type=int, default=10, help='Compras por cliente')
+        parser.add_argument('--productos', type=int, default=1000, help='Productos a sembrar')
+        parser.add_argument('--sin-pdf', action='store_true', help='No generar el PDF de cada orden')
+        parser.add_argument('--usar-bd-actual', action='store_true',
+                            help='No crear una BD de pruebas: usa la configurada (¡escribe en ella!)')
+        parser.add_argument('--salida', default=None, help='Archivo JSON de resultados')
+        parser.add_argument('--comparar', default=None, help='JSON de una ejecución anterior')
+        parser.add_argument('--tolerancia', type=float, default=20.0,
+                            help='%% de empeoramiento del p95 admitido al comparar')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as temporal:
+            config_bd = None
+            if not options['usar_bd_actual']:
+                if connection.vendor == 'sqlite':
+                    # La BD de pruebas en memoria bloquea tablas enteras con varios
+                    # hilos escribiendo: en un archivo se usan los bloqueos normales
+                    connection.settings_dict['TEST']['NAME'] = os.path.join(temporal, 'benchmark.sqlite3')
+                config_bd = setup_databases(verbosity=0, interactive=False)
+            try:
+                with override_settings(
+                    ALLOWED_HOSTS=['testserver'], PDF_CACHE_DIR=os.path.join(temporal, 'pdf'), DEBUG=False,
+                ):
+                    resultado = self.ejecutar(options)
+            finally:
+                if config_bd is not None:
+                    teardown_databases(config_bd, verbosity=0)
+
+        self.mostrar(resultado)
+        salida = options['salida'] or f"benchmark_{timezone.localtime():%Y%m%d_%H%M%S}.json"
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"💾 Resultados guardados en {salida}"))
+
+        if options['comparar']:
+            self.comparar(resultado, options['comparar'], options['tolerancia'])
+
+    def ejecutar(self, options):
+        concurrencia = options['concurrencia']
+        self.stdout.write(f"🌱 Sembrando {options['productos']} productos y {concurrencia} compradores...")
+        productos, categorias = sembrar(options['productos'], concurrencia)
+
+        medidor = Medidor()
+        errores = []
+
+        def comprador(indice):
+            rnd = random.Random(options['semilla'] + indice)
+            cliente = Client()
+            try:
+                medidor.medir('login', cliente.post, reverse('login'),
+                              {'username': f'bench_{indice}', 'password': CLAVE})
+                for _ in range(options['iteraciones']):
+                    medidor.medir('dashboard_busqueda', cliente.get, reverse('dashboard'), {'q': rnd.choice(BUSQUEDAS)})
+                    medidor.medir('dashboard_categoria', cliente.get, reverse('dashboard'),
+                                  {'categoria': rnd.choice(categorias)})
+                    for producto_id in rnd.sample(productos, min(3, len(productos))):
+                        medidor.medir('agregar_al_carrito', cliente.post,
+                                      reverse('agregar_al_carrito', args=[producto_id]), {'cantidad': 1})
+                    carrito = medidor.medir('ver_carrito', cliente.get, reverse('ver_carrito'))
+                    token = re.search(rb'name="token_compra" value="(\w+)"', carrito.content)
+                    compra = medidor.medir('procesar_compra', cliente.post, reverse('procesar_compra'),
+                                           {'token_compra': token.group(1).decode() if token else ''})
+                    orden_id = resolve(compra['Location']).kwargs.get('orden_id') if compra.status_code == 302 else None
+                    if orden_id is None:
+                        medidor.fallo('procesar_compra')  # La vista volvió al carrito con un error
+                    elif not options['sin_pdf']:
+                        medidor.medir('generar_pdf_orden', cliente.get, reverse('pdf_orden', args=[orden_id]))
+            except Exception as e:
+                errores.append(f"Cliente {indice}: {e!r}")
+            finally:
+                connection.close()
+
+        def administrador():
+            cliente = Client()
+            try:
+                medidor.medir('login_admin', cliente.post, reverse('login'),
+                              {'username': 'bench_admin', 'password': CLAVE})
+                for _ in range(options['iteraciones']):
+                    medidor.medir('admin_productos_vendidos', cliente.get, reverse('admin_productos_vendidos'))
+                    medidor.medir('admin_exportar_csv', cliente.get, reverse('admin_exportar_csv'))
+            except Exception as e:
+                errores.append(f"Administrador: {e!r}")
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=comprador, args=(i,)) for i in range(concurrencia)]
+        hilos.append(threading.Thread(target=administrador))
+        self.stdout.write(f"🏃 {concurrencia} compradores × {options['iteraciones']} compras + 1 administrador...")
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        peticiones = sum(len(v) for v in medidor.latencias.values())
+        return {
+            'fecha': timezone.now().isoformat(),
+            'commit': _commit_actual(),
+            'motor_bd': connection.vendor,
+            'config': {k: options[k] for k in ('concurrencia', 'iteraciones', 'productos', 'sin_pdf', 'semilla')},
+            'duracion_s': round(duracion, 3),
+            'peticiones': peticiones,
+            'peticiones_por_segundo': round(peticiones / duracion, 2) if duracion else 0,
+            'pasos': {paso: {**resumir(lat), 'errores': medidor.errores[paso]}
+                      for paso, lat in sorted(medidor.latencias.items())},
+            'excepciones': errores,
+        }
+
+    def mostrar(self, resultado):
+        self.stdout.write(
+            f"\n⏱️ {resultado['peticiones']} peticiones en {resultado['duracion_s']}s "
+            f"→ {resultado['peticiones_por_segundo']} req/s ({resultado['motor_bd']})"
+        )
+        self.stdout.write(f"{'paso':<26}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'errores':>9}")
+        for paso, datos in resultado['pasos'].items():
+            self.stdout.write(
+                f"{paso:<26}{datos['n']:>6}{datos['p50_ms']:>10}{datos['p95_ms']:>10}"
+                f"{datos['p99_ms']:>10}{datos['errores']:>9}"
+            )
+        for error in resultado['excepciones']:
+            self.stdout.write(self.style.ERROR(f"❌ {error}"))
+        if resultado['motor_bd'] == 'sqlite' and resultado['config']['concurrencia'] > 1:
+            self.stdout.write(self.style.WARNING(
+                "⚠️ SQLite serializa las escrituras (y puede rechazar alguna compra concurrente): "
+                "para medir concurrencia usa PostgreSQL."
+            ))
+
+    def comparar(self, resultado, archivo, tolerancia):
+        with open(archivo, encoding='utf-8') as f:
+            anterior = json.load(f)
+        self.stdout.write(f"\n📊 Comparación con {archivo} ({anterior.get('commit') or 'sin commit'}):")
+        regresiones = []
+        for paso, datos in resultado['pasos'].items():
+            previo = anterior.get('pasos', {}).get(paso)
+            if not previo or not previo['p95_ms']:
+                continue
+            cambio = (datos['p95_ms'] - previo['p95_ms']) / previo['p95_ms'] * 100
+            linea = f"{paso:<26} p95 {previo['p95_ms']:>9} → {datos['p95_ms']:>9} ms ({cambio:+.1f}%)"
+            if cambio > tolerancia:
+                regresiones.append(paso)
+                self.stdout.write(self.style.ERROR(linea))
+            else:
+                self.stdout.write(linea)
+        if regresiones:
+            raise CommandError(f"Regresión de rendimiento (> {tolerancia}% en p95): {', '.join(regresiones)}")
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
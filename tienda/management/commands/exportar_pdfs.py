@@ -0,0 +1,30 @@
+import os
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from tienda.pdf import ordenes_para_exportar, zip_pdfs_ordenes
+
+class Command(BaseCommand):
+    help = 'Genera un ZIP con los PDFs de las órdenes filtradas, renderizando en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help='Ruta del archivo ZIP a generar')
+        parser.add_argument('--desde', help='YYYY-MM-DD')
+        parser.add_argument('--hasta', help='YYYY-MM-DD')
+        parser.add_argument('--usuario', help='Nombre de usuario')
+        parser.add_argument('--estado', choices=['pendiente', 'completada', 'cancelada'])
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos de renderizado (por defecto: todos los núcleos)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else None
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+        except ValueError:
+            raise CommandError("Formato de fecha inválido. Usa YYYY-MM-DD")
+
+        orden_ids = list(ordenes_para_exportar(desde, hasta, options['usuario'], options['estado']))
+        self.stdout.write(f"📄 Exportando {len(orden_ids)} orden(es)...")
+        with open(options['salida'], 'wb') as archivo:
+            for bloque in zip_pdfs_ordenes(orden_ids, procesos=options['procesos']):
+                archivo.write(bloque)
+        self.stdout.write(self.style.SUCCESS(f"✅ ZIP generado: {options['salida']}"))
\ No newline at end of file
@@ -0,0 +1,340 @@
+import io
+import json
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from tienda.catalogo import invalidar_catalogo
+from tienda.models import Carrito, Categoria, ItemCarrito, ItemOrden, Orden, Producto
+from tienda.reportes import reconstruir_ventas_diarias
+
+NOMBRES = ['Ana', 'Luis', 'María', 'Carlos', 'Lucía', 'Jorge', 'Rosa', 'Pedro', 'Elena', 'Diego']
+APELLIDOS = ['Quispe', 'García', 'Flores', 'Rojas', 'Torres', 'Díaz', 'Vargas', 'Castillo', 'Mendoza', 'Ramos']
+PRODUCTOS = ['Chocolate', 'Galleta', 'Caramelo', 'Peluche', 'Licuadora', 'Taza', 'Mermelada', 'Rompecabezas',
+             'Cafetera', 'Turrón', 'Alfajor', 'Plancha', 'Muñeca', 'Sartén', 'Gomitas', 'Toalla']
+ADJETIVOS = ['Premium', 'Clásico', 'Artesanal', 'Mini', 'Familiar', 'Deluxe', 'Económico', 'Andino']
+ESTADOS = ['completada'] * 18 + ['pendiente', 'cancelada']
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return '\\N'
+    if valor is True:
+        return 't'
+    if valor is False:
+        return 'f'
+    if isinstance(valor, dict):
+        return _valor_copy(json.dumps(valor))
+    texto = str(valor)
+    if '\\' in texto or '\t' in texto or '\n' in texto or '\r' in texto:
+        texto = texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return texto
+
+
+class Cargador:
+    """
+    Acumula filas de `modelo` (valores en el orden de `campos`, con ids explícitos)
+    y las vuelca cada `lote` filas: COPY FROM STDIN en PostgreSQL, bulk_create en
+    el resto. `antes` es otro Cargador que debe vaciarse primero (claves foráneas).
+    """
+
+    def __init__(self, modelo, campos, lote, antes=None):
+        self.modelo = modelo
+        self.campos = campos
+        self.lote = lote
+        self.antes = antes
+        self.filas = []
+        self.total = 0
+        self.segundos = 0.0
+        self.copy = connection.vendor == 'postgresql'
+        self.campos_auto = [
+            campo for campo in (modelo._meta.get_field(c) for c in campos)
+            if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+        ]
+        if self.copy:
+            columnas = ', '.join(connection.ops.quote_name(modelo._meta.get_field(c).column) for c in campos)
+            self.sql_copy = f"COPY {connection.ops.quote_name(modelo._meta.db_table)} ({columnas}) FROM STDIN"
+
+    def agregar(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.lote:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.antes is not None:
+            self.antes.vaciar()
+        if not self.filas:
+            return
+        inicio = time.perf_counter()
+        if self.copy:
+            self._copy()
+        else:
+            with _sin_auto_now(self.campos_auto):  # Si no, pre_save pondría "ahora" en todas las fechas
+                self.modelo.objects.bulk_create(
+                    [self.modelo(**dict(zip(self.campos, fila))) for fila in self.filas],
+                    batch_size=1000,
+                )
+        self.segundos += time.perf_counter() - inicio
+        self.total += len(self.filas)
+        self.filas = []
+
+    def _copy(self):
+        datos = ''.join('\t'.join(map(_valor_copy, fila)) + '\n' for fila in self.filas)
+        with connection.cursor() as cursor:
+            crudo = cursor.cursor
+            if hasattr(crudo, 'copy_expert'):  # psycopg2
+                crudo.copy_expert(self.sql_copy, io.StringIO(datos))
+            else:  # psycopg 3
+                with crudo.copy(self.sql_copy) as copy:
+                    copy.write(datos)
+
+
+@contextmanager
+def _sin_auto_now(campos):
+    """Desactiva auto_now/auto_now_add para que bulk_create respete las fechas generadas."""
+    previos = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo, _, _ in previos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in previos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def _siguiente_id(modelo):
+    return (modelo.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos (usuarios, categorías, productos, carritos y órdenes) para pruebas de escala'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10000)
+        parser.add_argument('--categorias', type=int, default=10, help='Categorías raíz')
+        parser.add_argument('--subcategorias', type=int, default=5, help='Subcategorías por categoría raíz')
+        parser.add_argument('--productos', type=int, default=100000)
+        parser.add_argument('--carritos', type=int, default=None, help='Por defecto, uno por cada 10 usuarios')
+        parser.add_argument('--ordenes', type=int, default=100000)
+        parser.add_argument('--max-lineas', type=int, default=5, help='Líneas máximas por orden/carrito')
+        parser.add_argument('--dias', type=int, default=365, help='Antigüedad máxima de las órdenes')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=10000, help='Filas por COPY / bulk_create')
+        parser.add_argument('--clave', default='demo1234', help='Contraseña de los usuarios sintéticos')
+        parser.add_argument('--sin-hash', action='store_true',
+                            help='No calcular ningún hash: los usuarios quedan sin contraseña utilizable')
+        parser.add_argument('--sin-resumen', action='store_true', help='No reconstruir VentaDiaria al terminar')
+
+    def handle(self, *args, **o):
+        self.rnd = random.Random(o['semilla'])
+        self.ahora = timezone.now()
+        self.lote = o['lote']
+        self.cargadores = []
+        inicio = time.perf_counter()
+
+        usuarios = self.generar_usuarios(o)
+        if not usuarios:
+            usuarios = list(User.objects.values_list('id', flat=True)[:1000])
+            if not usuarios:
+                raise CommandError("Se necesita al menos un usuario (usa --usuarios N).")
+        hojas = self.generar_categorias(o)
+        if not hojas and o['productos']:
+            hojas = list(Categoria.objects.filter(padre__isnull=False).values_list('id', flat=True))
+            if not hojas:
+                raise CommandError("Se necesita al menos una subcategoría (usa --subcategorias N).")
+        productos = self.generar_productos(o, usuarios, hojas)
+        if productos[1]:
+            carritos = o['carritos'] if o['carritos'] is not None else len(usuarios) // 10
+            self.generar_carritos(o, usuarios, productos, carritos)
+            self.generar_ordenes(o, usuarios, productos)
+
+        self.reiniciar_secuencias()
+        if o['categorias'] and o['subcategorias']:
+            Categoria.reconstruir_arbol()
+        invalidar_catalogo()  # COPY/bulk_create no emiten señales
+        if o['ordenes'] and not o['sin_resumen']:
+            self.stdout.write("📊 Reconstruyendo el resumen de ventas diarias...")
+            reconstruir_ventas_diarias()
+
+        total = sum(c.total for c in self.cargadores)
+        segundos = sum(c.segundos for c in self.cargadores)
+        for c in self.cargadores:
+            if c.total:
+                self.stdout.write(
+                    f"   {c.modelo._meta.verbose_name_plural:<22}{c.total:>12,} filas "
+                    f"{c.total / c.segundos if c.segundos else 0:>12,.0f} filas/s"
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total:,} filas en {time.perf_counter() - inicio:.1f}s "
+            f"(escritura: {total / segundos if segundos else 0:,.0f} filas/s, {connection.vendor})"
+        ))
+
+    def cargador(self, modelo, campos, antes=None):
+        cargador = Cargador(modelo, campos, self.lote, antes)
+        self.cargadores.append(cargador)
+        return cargador
+
+    def fecha_aleatoria(self, dias):
+        return self.ahora - timedelta(seconds=self.rnd.randrange(max(1, dias * 86400)))
+
+    # ===== GENERADORES =====
+
+    def generar_usuarios(self, o):
+        if not o['usuarios']:
+            return []
+        clave = make_password(None) if o['sin_hash'] else make_password(o['clave'])  # Un único hash para todos
+        base = _siguiente_id(User)
+        cargador = self.cargador(User, [
+            'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name', 'last_name',
+            'email', 'is_staff', 'is_active', 'date_joined',
+        ])
+        rnd = self.rnd
+        for uid in range(base, base + o['usuarios']):
+            username = f"sint{uid}"
+            cargador.agregar((
+                uid, clave, None, False, username, rnd.choice(NOMBRES), rnd.choice(APELLIDOS),
+                f"{username}@ejemplo.test", False, True, self.fecha_aleatoria(o['dias'] * 2),
+            ))
+        cargador.vaciar()
+        self.stdout.write(f"👤 {o['usuarios']:,} usuarios")
+        return range(base, base + o['usuarios'])
+
+    def generar_categorias(self, o):
+        if not o['categorias'] or not o['subcategorias']:
+            return []
+        base = _siguiente_id(Categoria)
+        cargador = self.cargador(Categoria, ['id', 'nombre', 'descripcion', 'padre_id', 'ruta', 'nivel'])
+        hojas = []
+        siguiente = base
+        for r in range(o['categorias']):
+            raiz = siguiente
+            siguiente += 1
+            cargador.agregar((raiz, f"Tipo {raiz}", None, None, '', 0))
+            for _ in range(o['subcategorias']):
+                cargador.agregar((siguiente, f"Categoría {siguiente}", None, raiz, '', 1))
+                hojas.append(siguiente)
+                siguiente += 1
+        cargador.vaciar()
+        self.stdout.write(f"🗂️ {siguiente - base:,} categorías")
+        return hojas
+
+    def generar_productos(self, o, usuarios, hojas):
+        """Devuelve (id base, precios en céntimos por índice; 0 = sin precio)."""
+        precios = array('l')
+        if not o['productos']:
+            return 0, precios
+        base = _siguiente_id(Producto)
+        cargador = self.cargador(Producto, [
+            'id', 'sku', 'nombre', 'descripcion', 'precio', 'costo', 'cantidad', 'imagen', 'usuario_id',
+            'categoria_id', 'fecha_vencimiento', 'created_at', 'updated_at', 'created_by_id', 'updated_by_id',
+            'visible_para_usuario', 'imagen_rendiciones',
+        ])
+        rnd = self.rnd
+        for i in range(o['productos']):
+            centimos = 0 if rnd.random() < 0.1 else rnd.randrange(100, 50000)
+            precios.append(centimos)
+            usuario = rnd.choice(usuarios)
+            creado = self.fecha_aleatoria(o['dias'])
+            cargador.agregar((
+                base + i, f'GEN-{base + i}', self.nombre_producto(base + i), None,
+                Decimal(centimos).scaleb(-2) if centimos else None,
+                Decimal(centimos * rnd.randrange(50, 90) // 100 or rnd.randrange(100, 30000)).scaleb(-2),
+                0 if rnd.random() < 0.05 else rnd.randrange(1, 500), '', usuario, rnd.choice(hojas),
+                None, creado, creado, usuario, None, bool(centimos), {},
+            ))
+        cargador.vaciar()
+        self.stdout.write(f"📦 {o['productos']:,} productos")
+        return base, precios
+
+    def nombre_producto(self, producto_id):
+        return f"{PRODUCTOS[producto_id % len(PRODUCTOS)]} {ADJETIVOS[producto_id // len(PRODUCTOS) % len(ADJETIVOS)]} {producto_id}"
+
+    def producto_con_precio(self, productos):
+        base, precios = productos
+        while True:
+            i = self.rnd.randrange(len(precios))
+            if precios[i]:
+                return base + i, precios[i]
+
+    def generar_carritos(self, o, usuarios, productos, cantidad):
+        # Un carrito por usuario: si se reutilizan usuarios existentes, se saltan los que ya tienen
+        con_carrito = set()
+        if not isinstance(usuarios, range):
+            con_carrito = set(Carrito.objects.filter(usuario_id__in=usuarios).values_list('usuario_id', flat=True))
+        candidatos = [u for u in usuarios if u not in con_carrito][:cantidad]
+        if not candidatos:
+            return
+        base = _siguiente_id(Carrito)
+        base_item = _siguiente_id(ItemCarrito)
+        carritos = self.cargador(Carrito, ['id', 'usuario_id', 'creado_en', 'actualizado_en', 'activo', 'num_items'])
+        items = self.cargador(
+            ItemCarrito, ['id', 'carrito_id', 'producto_id', 'cantidad', 'agregado_en'], antes=carritos
+        )
+        rnd = self.rnd
+        item_id = base_item
+        for n, usuario in enumerate(candidatos):
+            carrito_id = base + n
+            elegidos = {self.producto_con_precio(productos)[0]: rnd.randint(1, 3)
+                        for _ in range(rnd.randint(1, o['max_lineas']))}
+            creado = self.fecha_aleatoria(3)
+            # La fila padre va antes que sus ítems: al vaciar un lote nunca queda un ítem huérfano
+            carritos.agregar((carrito_id, usuario, creado, creado, True, sum(elegidos.values())))
+            for producto_id, cantidad_item in elegidos.items():
+                items.agregar((item_id, carrito_id, producto_id, cantidad_item, creado))
+                item_id += 1
+        items.vaciar()
+        self.stdout.write(f"🛒 {len(candidatos):,} carritos")
+
+    def generar_ordenes(self, o, usuarios, productos):
+        if not o['ordenes']:
+            return
+        base = _siguiente_id(Orden)
+        item_id = _siguiente_id(ItemOrden)
+        ordenes = self.cargador(Orden, [
+            'id', 'usuario_id', 'fecha', 'total', 'estado', 'created_by_id', 'token_idempotencia',
+            'total_lineas', 'total_unidades',
+        ])
+        items = self.cargador(
+            ItemOrden, ['id', 'orden_id', 'producto_nombre', 'producto_id', 'cantidad', 'precio_unitario'],
+            antes=ordenes,
+        )
+        rnd = self.rnd
+        for orden_id in range(base, base + o['ordenes']):
+            usuario = rnd.choice(usuarios)
+            lineas = {}
+            for _ in range(rnd.randint(1, o['max_lineas'])):
+                producto_id, centimos = self.producto_con_precio(productos)
+                lineas[producto_id] = (centimos, rnd.randint(1, 4))
+            ordenes.agregar((
+                orden_id, usuario, self.fecha_aleatoria(o['dias']),
+                Decimal(sum(c * n for c, n in lineas.values())).scaleb(-2),
+                rnd.choice(ESTADOS), usuario, None, len(lineas), sum(n for _, n in lineas.values()),
+            ))
+            for producto_id, (centimos, cantidad_item) in lineas.items():
+                items.agregar((
+                    item_id, orden_id, self.nombre_producto(producto_id), producto_id,
+                    cantidad_item, Decimal(centimos).scaleb(-2),
+                ))
+                item_id += 1
+        items.vaciar()
+        self.stdout.write(f"🧾 {o['ordenes']:,} órdenes")
+
+    def reiniciar_secuencias(self):
+        # Se insertaron ids explícitos: las secuencias deben continuar tras el máximo
+        sentencias = connection.ops.sequence_reset_sql(
+            no_style(), [User, Categoria, Producto, Carrito, ItemCarrito, Orden, ItemOrden]
+        )
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sql in sentencias:
+                    cursor.execute(sql)
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connection
+from django.core.management.base import BaseCommand
+from tienda.imagenes import generar_rendiciones, rendiciones_vigentes
+from tienda.models import Producto
+
+def _generar(producto_id, nombre):
+    try:
+        return generar_rendiciones(producto_id, nombre)
+    finally:
+        connection.close()  # Cada hilo abre su propia conexión
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas (thumb/card/full, WebP y JPEG) de las imágenes de productos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya existen')
+        parser.add_argument('--hilos', type=int, default=None)
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True).only('id', 'imagen', 'imagen_rendiciones')
+        pendientes = [
+            (p.id, p.imagen.name) for p in productos.iterator(chunk_size=2000)
+            if options['todas'] or not rendiciones_vigentes(p)
+        ]
+        self.stdout.write(f"🖼️ {len(pendientes)} imagen(es) por procesar...")
+
+        hilos = options['hilos'] or getattr(settings, 'IMAGENES_HILOS', 2)
+        errores = 0
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = {pool.submit(_generar, pid, nombre): nombre for pid, nombre in pendientes}
+            for futuro in as_completed(futuros):
+                try:
+                    futuro.result()
+                except Exception as e:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(f"❌ {futuros[futuro]}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rendiciones generadas: {len(pendientes) - errores}. Errores: {errores}."))
\ No newline at end of file
@@ -0,0 +1,61 @@
+import csv
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from tienda.importacion import ErrorImportacion, importar_productos
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde un CSV/XLSX (crea los SKU nuevos y actualiza los existentes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='CSV o XLSX con columnas sku, nombre, descripcion, costo, cantidad, '
+                                            'categoria, fecha_vencimiento, imagen')
+        parser.add_argument('--usuario', required=True, help='Usuario (almacenero) al que se atribuyen los cambios')
+        parser.add_argument('--imagenes', help='ZIP con las imágenes que nombra la columna imagen')
+        parser.add_argument('--reemplazar-stock', action='store_true',
+                            help='La cantidad reemplaza al stock de los SKU existentes en lugar de sumarse')
+        parser.add_argument('--lote', type=int, default=None, help='Filas por lote (por defecto: IMPORTACION_LOTE)')
+        parser.add_argument('--codificacion', default='utf-8-sig', help='Codificación del CSV (p. ej. cp1252)')
+        parser.add_argument('--errores', help='Escribir el informe de errores por fila en este CSV')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario '{options['usuario']}'")
+
+        inicio = time.perf_counter()
+        imagenes = open(options['imagenes'], 'rb') if options['imagenes'] else None
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_productos(
+                    archivo, usuario,
+                    imagenes=imagenes,
+                    reemplazar_stock=options['reemplazar_stock'],
+                    lote=options['lote'],
+                    codificacion=options['codificacion'],
+                )
+        except (ErrorImportacion, OSError) as e:
+            raise CommandError(str(e))
+        finally:
+            if imagenes:
+                imagenes.close()
+        segundos = time.perf_counter() - inicio
+
+        if options['errores']:
+            with open(options['errores'], 'w', newline='', encoding='utf-8') as salida:
+                writer = csv.writer(salida)
+                writer.writerow(['fila', 'sku', 'error'])
+                writer.writerows(resultado.errores)
+        else:
+            for fila, sku, mensaje in resultado.errores:
+                self.stdout.write(self.style.ERROR(f"❌ Fila {fila or '—'} [{sku}]: {mensaje}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado.filas} fila(s) en {segundos:.1f}s: {resultado.creados} creado(s), "
+            f"{resultado.actualizados} actualizado(s), {len(resultado.errores)} con errores."
+        ))
+        if resultado.errores and options['errores']:
+            self.stdout.write(f"📝 Informe de errores: {options['errores']}")
@@ -1,55 +1,61 @@
+import logging
+import time
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
 from django.utils import timezone
-from django.db import transaction
-from datetime import timedelta
-from tienda.models import Carrito, ItemCarrito
+from tienda.inventario import items_vencidos, liberar_items_vencidos
+
+logger = logging.getLogger(__name__)
+
 
 class Command(BaseCommand):
-    help = 'Limpia carritos abandonados (sin actividad en 24h) y devuelve el stock'
+    help = 'Limpia ítems de carrito abandonados (sin comprar en 24h) y devuelve el stock'
 
     def add_arguments(self, parser):
         parser.add_argument('--horas', type=int, default=24)
         parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--lote', type=int, default=1000, help='Carritos por transacción')
+        parser.add_argument('--loop', action='store_true', help='Repetir la limpieza indefinidamente')
+        parser.add_argument('--interval', type=int, default=300, help='Segundos entre pasadas con --loop')
 
     def handle(self, *args, **options):
+        if not options['loop']:
+            self.limpiar(options)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"🔁 Limpieza cada {options['interval']}s (Ctrl+C para salir)"))
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    self.limpiar(options)
+                except DatabaseError as e:
+                    # Un deadlock o una conexión caída no detienen el proceso: se reintenta en la próxima pasada
+                    logger.exception("Falló una pasada de limpieza de carritos")
+                    self.stderr.write(f"❌ Falló la limpieza: {e}. Se reintenta en {options['interval']}s.")
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("👋 Limpieza detenida.")
+
+    def limpiar(self, options):
         horas = options['horas']
-        dry_run = options['dry_run']
         limite = timezone.now() - timedelta(hours=horas)
-
-        carritos = Carrito.objects.filter(
-            items__isnull=False,
-            items__agregado_en__lt=limite
-        ).distinct()
-
-        total_carritos = carritos.count()
-        total_items = 0
-        total_stock_devuelto = 0
-
-        self.stdout.write(self.style.SUCCESS(f"🔍 Buscando carritos abandonados (> {horas}h)..."))
-
-        for carrito in carritos:
-            items = carrito.items.all()
-            count_items = items.count()
-            if count_items == 0:
-                continue
-
-            self.stdout.write(f"🧹 Carrito #{carrito.id} ({carrito.usuario.username}) → {count_items} item(s)")
-
-            if not dry_run:
-                with transaction.atomic():
-                    for item in items:
-                        producto = item.producto
-                        producto.cantidad += item.cantidad
-                        producto.save(update_fields=['cantidad'])
-                        total_stock_devuelto += item.cantidad
-                    items.delete()
-
-            total_items += count_items
-
-        if dry_run:
-            self.stdout.write(self.style.WARNING(f"[DRY RUN] Se limpiarían {total_items} items."))
-        else:
-            self.stdout.write(self.style.SUCCESS(
-                f"✅ Limpieza: {total_items} items en {total_carritos} carritos. "
-                f"Stock devuelto: {total_stock_devuelto}."
-            ))
\ No newline at end of file
+        inicio = time.monotonic()
+
+        if options['dry_run']:
+            m = items_vencidos(limite)
+            self.stdout.write(self.style.WARNING(
+                f"[DRY RUN] Se limpiarían {m['items']} items en {m['carritos']} carritos (> {horas}h). "
+                f"Stock a devolver: {m['unidades']}."
+            ))
+            return
+
+        m = liberar_items_vencidos(limite, lote=options['lote'])
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ [{timezone.localtime():%Y-%m-%d %H:%M:%S}] Limpieza (> {horas}h): "
+            f"{m['items']} items en {m['carritos']} carritos. "
+            f"Stock devuelto: {m['unidades']}. Duración: {duracion:.2f}s."
+        ))
\ No newline at end of file
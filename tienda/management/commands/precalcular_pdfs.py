@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tienda.models import Orden
+from tienda.pdf import ErrorPDF, obtener_pdf_orden, purgar_cache
+
+class Command(BaseCommand):
+    help = 'Pre-renderiza en la caché los PDFs de las órdenes recientes y purga la caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help='Órdenes de los últimos N días')
+        parser.add_argument('--solo-purgar', action='store_true', help='Solo aplica los límites de tamaño/antigüedad')
+
+    def handle(self, *args, **options):
+        if not options['solo_purgar']:
+            desde = timezone.now() - timedelta(days=options['dias'])
+            ordenes = Orden.objects.filter(fecha__gte=desde).select_related('usuario').prefetch_related('items')
+            generados = errores = 0
+            for orden in ordenes.iterator(chunk_size=200):
+                try:
+                    obtener_pdf_orden(orden)
+                    generados += 1
+                except ErrorPDF as e:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(f"❌ {e}"))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {generados} PDF(s) en caché (últimos {options['dias']} días). Errores: {errores}."
+            ))
+
+        borrados, liberados = purgar_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f"🧹 Purga: {borrados} archivo(s), {liberados / 1024 / 1024:.1f} MB liberados."
+        ))
\ No newline at end of file
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from tienda.catalogo import invalidar_catalogo
+from tienda.models import Categoria, CategoriaRelacion
+
+class Command(BaseCommand):
+    help = 'Regenera la tabla de clausura y las rutas de las categorías (p. ej. tras insertar_categoria.sql)'
+
+    def handle(self, *args, **options):
+        Categoria.reconstruir_arbol()
+        invalidar_catalogo()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Árbol reconstruido: {Categoria.objects.count()} categorías, '
+            f'{CategoriaRelacion.objects.count()} relaciones.'
+        ))
\ No newline at end of file
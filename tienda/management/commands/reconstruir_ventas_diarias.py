@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from tienda.reportes import reconstruir_ventas_diarias
+
+class Command(BaseCommand):
+    help = 'Regenera el resumen diario de ventas (VentaDiaria) a partir de las órdenes'
+
+    def handle(self, *args, **options):
+        total = reconstruir_ventas_diarias()
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen diario regenerado: {total} filas (producto × día).'))
\ No newline at end of file
@@ -0,0 +1,69 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from tienda.models import ItemCarrito, ItemOrden, Orden, Producto, VentaDiaria
+
+
+def consultas_frecuentes():
+    """Las consultas de los caminos calientes, tal como las lanzan las vistas y comandos."""
+    ahora = timezone.now()
+    usuario_id = Orden.objects.values_list('usuario_id', flat=True).first() or 0
+    producto_id = ItemOrden.objects.values_list('producto_id', flat=True).first() or 0
+    return {
+        'catálogo (dashboard)': Producto.objects.filter(
+            cantidad__gt=0, visible_para_usuario=True
+        ).order_by('-created_at', '-id')[:25],
+        'carritos vencidos (limpiar_carritos)': ItemCarrito.objects.filter(
+            agregado_en__lt=ahora - timedelta(hours=24)
+        ).values_list('id', 'carrito_id', 'producto_id', 'cantidad'),
+        'historial de compras': Orden.objects.filter(
+            usuario_id=usuario_id, estado='completada'
+        ).order_by('-fecha', '-id')[:25],
+        'órdenes por fecha (exportar_pdfs)': Orden.objects.filter(
+            fecha__gte=ahora - timedelta(days=30), fecha__lte=ahora
+        ).values_list('id', flat=True),
+        'ventas de un producto': ItemOrden.objects.filter(producto_id=producto_id).values('orden_id', 'cantidad'),
+        'resumen de ventas por rango': VentaDiaria.objects.filter(
+            dia__gte=(ahora - timedelta(days=30)).date()
+        ).values('producto_id', 'cantidad'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas frecuentes y falla si alguna recorre una tabla completa'
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor == 'postgresql':
+            patron = re.compile(r'Seq Scan on (\w+)')
+        elif vendor == 'sqlite':
+            # "SCAN tabla" sin índice (SCAN ... USING INDEX sí usa uno)
+            patron = re.compile(r'\bSCAN (\w+)(?!\w| USING)')
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ Motor '{vendor}' no soportado; nada que verificar."))
+            return
+
+        fallos = []
+        for nombre, queryset in consultas_frecuentes().items():
+            with transaction.atomic():
+                if vendor == 'postgresql':
+                    # Con pocas filas el planificador prefiere recorrer la tabla aunque
+                    # exista el índice: se desactiva para ver si hay uno que sirva
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+
+            tablas = patron.findall(plan)
+            if tablas:
+                fallos.append(nombre)
+                self.stdout.write(self.style.ERROR(f"❌ {nombre}: recorrido completo de {', '.join(tablas)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {nombre}"))
+            if options['verbosity'] > 1 or tablas:
+                self.stdout.write(f"   {plan.replace(chr(10), chr(10) + '   ')}")
+
+        if fallos:
+            raise CommandError(f"{len(fallos)} consulta(s) sin índice adecuado: {', '.join(fallos)}")
\ No newline at end of file
@@ -1,22 +1,215 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth import logout
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.shortcuts import redirect
-from django.urls import reverse
-from django.utils import timezone
+from django.template.base import Template
+
+CLAVE_ACTIVIDAD = 'last_activity'
+
+_estadisticas = {'escrituras': 0, 'evitadas': 0}
+_lock = threading.Lock()
+
+
+def estadisticas_sesion():
+    """Escrituras de actividad en la sesión hechas / evitadas por este proceso."""
+    with _lock:
+        return dict(_estadisticas)
+
+
+def _contar(clave):
+    with _lock:
+        _estadisticas[clave] += 1
+
 
 class SessionTimeoutMiddleware:
+    """
+    Cierra la sesión tras SESSION_INACTIVIDAD_SEGUNDOS sin actividad.
+
+    La última actividad se guarda como epoch (int) y solo se reescribe cuando
+    tiene más de SESSION_ACTIVIDAD_GRANULARIDAD segundos (o si la sesión se va a
+    guardar de todos modos), así la mayoría de las peticiones no escriben la
+    sesión. Funciona igual con sesiones en BD, en caché o en cookie firmada.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.inactividad = getattr(settings, 'SESSION_INACTIVIDAD_SEGUNDOS', 300)
+        self.granularidad = getattr(settings, 'SESSION_ACTIVIDAD_GRANULARIDAD', 60)
 
     def __call__(self, request):
-        if request.user.is_authenticated:
-            if not request.session.get('last_activity'):
-                request.session['last_activity'] = timezone.now().isoformat()
-            else:
-                last_activity = timezone.datetime.fromisoformat(request.session['last_activity'])
-                if (timezone.now() - last_activity).total_seconds() > 300:
-                    messages.info(request, "🔒 Sesión cerrada por inactividad (10 minutos).")
-                    from django.contrib.auth import logout
-                    logout(request)
-                    return redirect('login')
-            request.session['last_activity'] = timezone.now().isoformat()
-        return self.get_response(request)
\ No newline at end of file
+        if not request.user.is_authenticated:
+            return self.get_response(request)
+
+        ahora = int(time.time())
+        ultima = request.session.get(CLAVE_ACTIVIDAD)
+        if not isinstance(ultima, int):
+            ultima = None  # Sesión nueva o con el formato antiguo (ISO)
+        elif ahora - ultima > self.inactividad:
+            messages.info(request, f"🔒 Sesión cerrada por inactividad ({self.inactividad // 60} minutos).")
+            logout(request)
+            return redirect('login')
+
+        if ultima is None or ahora - ultima >= self.granularidad:
+            request.session[CLAVE_ACTIVIDAD] = ahora
+            _contar('escrituras')
+            return self.get_response(request)
+
+        response = self.get_response(request)
+        if request.session.modified:
+            # La sesión se guarda igualmente: se actualiza la actividad gratis
+            request.session[CLAVE_ACTIVIDAD] = ahora
+        else:
+            _contar('evitadas')
+        return response
+
+
+# ===== INSTRUMENTACIÓN (opcional: INSTRUMENTACION = True) =====
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+_muestras = defaultdict(lambda: deque(maxlen=getattr(settings, 'INSTRUMENTACION_MUESTRAS', 500)))
+_repetidas = defaultdict(Counter)
+_lock_muestras = threading.Lock()
+
+
+def _recortar(contador):
+    # Acotado como las muestras: al pasar del doble del máximo se quedan las firmas más frecuentes
+    maximo = getattr(settings, 'INSTRUMENTACION_REPETIDAS', 50)
+    if len(contador) > 2 * maximo:
+        mas_comunes = contador.most_common(maximo)
+        contador.clear()
+        contador.update(dict(mas_comunes))
+
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+def firma_sql(sql):
+    """SQL normalizado: sin literales y con las listas IN (...) colapsadas."""
+    return _LISTAS.sub('(...)', _LITERALES.sub('?', sql))
+
+
+class _Medicion:
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.firmas = Counter()
+        self.profundidad_plantillas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.firmas[firma_sql(sql)] += 1
+
+    def repetidas(self):
+        return {firma: n for firma, n in self.firmas.items() if n > 1}
+
+
+def _render_medido(render_original):
+    def render(self, context):
+        medicion = _medicion_actual.get()
+        if medicion is None or medicion.profundidad_plantillas:
+            return render_original(self, context)  # Solo se mide la plantilla exterior
+        medicion.profundidad_plantillas += 1
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context)
+        finally:
+            medicion.tiempo_plantillas += time.perf_counter() - inicio
+            medicion.profundidad_plantillas -= 1
+    render.medido = True
+    return render
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide por petición el número de consultas, el tiempo en SQL, el render de
+    plantillas y el tiempo total; lo devuelve en la cabecera Server-Timing y lo
+    acumula por nombre de URL (ver estadisticas_rendimiento()).
+
+    Desactivada (INSTRUMENTACION = False), Django la descarta al arrancar y no
+    añade ningún coste por petición.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not getattr(Template.render, 'medido', False):
+            Template.render = _render_medido(Template.render)
+
+    def __call__(self, request):
+        medicion = _Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+
+        repetidas = medicion.repetidas()
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={medicion.tiempo_sql * 1000:.1f};desc="{medicion.consultas} consultas"',
+            f'dup;desc="{sum(repetidas.values())} repetidas"',
+            f'tpl;dur={medicion.tiempo_plantillas * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = request.resolver_match
+        nombre = (match.view_name if match else None) or 'sin_ruta'
+        with _lock_muestras:
+            _muestras[nombre].append((total, medicion.tiempo_sql, medicion.consultas, medicion.tiempo_plantillas))
+            _repetidas[nombre].update(repetidas)
+            _recortar(_repetidas[nombre])
+        return response
+
+
+def _percentiles(valores):
+    ordenados = sorted(valores)
+    def p(q):
+        return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+    return {'p50': p(0.50), 'p95': p(0.95), 'p99': p(0.99)}
+
+
+def estadisticas_rendimiento(top_repetidas=5):
+    """Percentiles por nombre de URL de las últimas INSTRUMENTACION_MUESTRAS peticiones."""
+    with _lock_muestras:
+        copia = {nombre: list(muestras) for nombre, muestras in _muestras.items()}
+        repetidas = {nombre: contador.most_common(top_repetidas) for nombre, contador in _repetidas.items()}
+
+    resultado = {}
+    for nombre, muestras in sorted(copia.items()):
+        total, sql, consultas, plantillas = zip(*muestras)
+        resultado[nombre] = {
+            'peticiones': len(muestras),
+            'total_ms': {k: round(v * 1000, 1) for k, v in _percentiles(total).items()},
+            'sql_ms': {k: round(v * 1000, 1) for k, v in _percentiles(sql).items()},
+            'plantillas_ms': {k: round(v * 1000, 1) for k, v in _percentiles(plantillas).items()},
+            'consultas': _percentiles(consultas),
+            'consultas_repetidas': [{'sql': sql, 'veces': n} for sql, n in repetidas.get(nombre, [])],
+        }
+    return resultado
+
+
+def reiniciar_estadisticas():
+    with _lock_muestras:
+        _muestras.clear()
+        _repetidas.clear()
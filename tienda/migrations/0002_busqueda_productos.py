@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+# Solo PostgreSQL: en SQLite el índice FTS5 lo crea tienda.busqueda.asegurar_indice_sqlite (post_migrate)
+SQL_CREAR = """
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+ALTER TABLE tienda_producto ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('es_unaccent', coalesce(nombre, '')), 'A') ||
+    setweight(to_tsvector('es_unaccent', coalesce(descripcion, '')), 'B')
+) STORED;
+CREATE INDEX producto_busqueda_gin ON tienda_producto USING gin (busqueda);
+"""
+
+SQL_BORRAR = """
+DROP INDEX IF EXISTS producto_busqueda_gin;
+ALTER TABLE tienda_producto DROP COLUMN IF EXISTS busqueda;
+"""
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_CREAR)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_BORRAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
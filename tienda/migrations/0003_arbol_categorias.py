@@ -0,0 +1,78 @@
+# Generated by Django 6.0 on 2026-10-18 06:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def construir_arbol(apps, schema_editor):
+    Categoria = apps.get_model('tienda', 'Categoria')
+    CategoriaRelacion = apps.get_model('tienda', 'CategoriaRelacion')
+    categorias = {c.pk: c for c in Categoria.objects.all()}
+    relaciones = []
+    for categoria in categorias.values():
+        nombres = []
+        actual, profundidad, vistos = categoria, 0, set()
+        while actual is not None and actual.pk not in vistos:
+            vistos.add(actual.pk)
+            nombres.append(actual.nombre)
+            relaciones.append(CategoriaRelacion(
+                ancestro_id=actual.pk, descendiente_id=categoria.pk, profundidad=profundidad
+            ))
+            actual = categorias.get(actual.padre_id)
+            profundidad += 1
+        categoria.ruta = ' > '.join(reversed(nombres))
+        categoria.nivel = len(nombres) - 1
+    CategoriaRelacion.objects.bulk_create(relaciones, batch_size=1000)
+    Categoria.objects.bulk_update(categorias.values(), ['ruta', 'nivel'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0002_busqueda_productos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='ruta',
+            field=models.CharField(default='', editable=False, max_length=1000),
+        ),
+        migrations.CreateModel(
+            name='LoginAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_attempt', models.DateTimeField(auto_now=True)),
+                ('blocked_until', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Intento de Login',
+                'verbose_name_plural': 'Intentos de Login',
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoriaRelacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidad', models.PositiveSmallIntegerField()),
+                ('ancestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendientes_rel', to='tienda.categoria')),
+                ('descendiente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestros_rel', to='tienda.categoria')),
+            ],
+            options={
+                'verbose_name': 'Relación de Categoría',
+                'verbose_name_plural': 'Relaciones de Categoría',
+                'indexes': [models.Index(fields=['descendiente', 'profundidad'], name='tienda_cate_descend_e2976a_idx')],
+                'unique_together': {('ancestro', 'descendiente')},
+            },
+        ),
+        migrations.RunPython(construir_arbol, migrations.RunPython.noop),
+    ]
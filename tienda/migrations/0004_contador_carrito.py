@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 06:54
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_contadores(apps, schema_editor):
+    Carrito = apps.get_model('tienda', 'Carrito')
+    ItemCarrito = apps.get_model('tienda', 'ItemCarrito')
+    unidades = ItemCarrito.objects.filter(carrito=OuterRef('pk')).values('carrito').annotate(
+        total=Sum('cantidad')
+    ).values('total')
+    Carrito.objects.update(num_items=Coalesce(Subquery(unidades), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0003_arbol_categorias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 06:55
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Max, Sum
+from django.db.models.functions import TruncDate
+
+
+def calcular_ventas_diarias(apps, schema_editor):
+    ItemOrden = apps.get_model('tienda', 'ItemOrden')
+    VentaDiaria = apps.get_model('tienda', 'VentaDiaria')
+    filas = ItemOrden.objects.annotate(dia=TruncDate('orden__fecha')).values('dia', 'producto_id').annotate(
+        nombre=Max('producto_nombre'),
+        total_cantidad=Sum('cantidad'),
+        total_importe=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField()),
+        ultima=Max('orden__fecha'),
+    ).order_by()
+    VentaDiaria.objects.bulk_create((
+        VentaDiaria(
+            dia=f['dia'],
+            producto_id=f['producto_id'],
+            producto_nombre=f['nombre'],
+            cantidad=f['total_cantidad'],
+            importe=f['total_importe'],
+            ultima_venta=f['ultima'],
+        ) for f in filas.iterator(chunk_size=2000)
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0004_contador_carrito'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('producto_id', models.PositiveIntegerField()),
+                ('producto_nombre', models.CharField(max_length=200)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('importe', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ultima_venta', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'unique_together': {('dia', 'producto_id')},
+            },
+        ),
+        migrations.RunPython(calcular_ventas_diarias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0005_ventas_diarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='token_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 07:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0006_token_idempotencia_orden'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemcarrito',
+            index=models.Index(fields=['agregado_en'], name='itemcarrito_agregado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemorden',
+            index=models.Index(fields=['producto_id'], name='itemorden_producto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['usuario', 'estado', '-fecha', '-id'], name='orden_historial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['fecha'], name='orden_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('cantidad__gt', 0), ('visible_para_usuario', True)), fields=['-created_at', '-id'], name='producto_catalogo_idx'),
+        ),
+    ]
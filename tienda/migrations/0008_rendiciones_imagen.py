@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0007_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_rendiciones',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
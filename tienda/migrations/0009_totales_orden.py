@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 07:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    Orden = apps.get_model('tienda', 'Orden')
+    ItemOrden = apps.get_model('tienda', 'ItemOrden')
+    por_orden = ItemOrden.objects.filter(orden=OuterRef('pk')).values('orden')
+    Orden.objects.update(
+        total_lineas=Coalesce(Subquery(por_orden.annotate(n=Count('id')).values('n')), 0),
+        total_unidades=Coalesce(Subquery(por_orden.annotate(n=Sum('cantidad')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0008_rendiciones_imagen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orden',
+            name='total_lineas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orden',
+            name='total_unidades',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 07:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0012_version_catalogo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='costo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from decimal import Decimal
 from django.utils import timezone
@@ -14,6 +15,9 @@ class Categoria(models.Model):
         blank=True,
         related_name='subcategorias'
     )
+    # Ruta materializada ("Padre > Hijo") y profundidad, mantenidas en save()
+    ruta = models.CharField(max_length=1000, default='', editable=False)
+    nivel = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = "Categoría"
@@ -21,17 +25,170 @@ class Categoria(models.Model):
         ordering = ['nombre']
 
     def __str__(self):
-        if self.padre:
-            return f"{self.padre} > {self.nombre}"
-        return self.nombre
+        return self.ruta or self.nombre
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_cargados = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        cargados = getattr(self, '_valores_cargados', {})
+        nuevo = self._state.adding
+        movida = not nuevo and cargados.get('padre_id', self.padre_id) != self.padre_id
+        renombrada = not nuevo and cargados.get('nombre', self.nombre) != self.nombre
+
+        with transaction.atomic():
+            if nuevo or movida or renombrada:
+                if self.padre_id:
+                    padre = Categoria.objects.only('ruta', 'nivel').get(pk=self.padre_id)
+                    self.ruta = f"{padre.ruta} > {self.nombre}"
+                    self.nivel = padre.nivel + 1
+                else:
+                    self.ruta = self.nombre
+                    self.nivel = 0
+            if movida:
+                self._mover_subarbol()
+            super().save(*args, **kwargs)
+            if nuevo:
+                self._insertar_en_arbol()
+            elif movida or renombrada:
+                Categoria.actualizar_rutas(self.ids_subarbol(self.pk))
+
+        self._valores_cargados = {'padre_id': self.padre_id, 'nombre': self.nombre}
+
+    def _insertar_en_arbol(self):
+        relaciones = [CategoriaRelacion(ancestro_id=self.pk, descendiente_id=self.pk, profundidad=0)]
+        if self.padre_id:
+            relaciones += [
+                CategoriaRelacion(ancestro_id=ancestro_id, descendiente_id=self.pk, profundidad=profundidad + 1)
+                for ancestro_id, profundidad in CategoriaRelacion.objects.filter(
+                    descendiente_id=self.padre_id
+                ).values_list('ancestro_id', 'profundidad')
+            ]
+        CategoriaRelacion.objects.bulk_create(relaciones)
+
+    def _mover_subarbol(self):
+        subarbol = list(
+            CategoriaRelacion.objects.filter(ancestro_id=self.pk).values_list('descendiente_id', 'profundidad')
+        )
+        ids = [descendiente_id for descendiente_id, _ in subarbol]
+        if self.padre_id in ids:
+            raise ValueError(f"'{self.nombre}' no puede ser subcategoría de sí misma ni de sus descendientes.")
+
+        # Desenganchar el subárbol de sus ancestros actuales...
+        CategoriaRelacion.objects.filter(descendiente_id__in=ids).exclude(ancestro_id__in=ids).delete()
+        # ...y colgarlo de los ancestros del nuevo padre
+        if self.padre_id:
+            ancestros = CategoriaRelacion.objects.filter(
+                descendiente_id=self.padre_id
+            ).values_list('ancestro_id', 'profundidad')
+            CategoriaRelacion.objects.bulk_create([
+                CategoriaRelacion(
+                    ancestro_id=ancestro_id,
+                    descendiente_id=descendiente_id,
+                    profundidad=p_ancestro + p_descendiente + 1,
+                )
+                for ancestro_id, p_ancestro in ancestros
+                for descendiente_id, p_descendiente in subarbol
+            ])
+
+    @staticmethod
+    def ids_subarbol(categoria_id):
+        """Subconsulta con los ids de la categoría y todos sus descendientes."""
+        return CategoriaRelacion.objects.filter(ancestro_id=categoria_id).values('descendiente_id')
+
+    @staticmethod
+    def actualizar_rutas(ids):
+        """Recalcula `ruta` y `nivel` de las categorías `ids` desde la tabla de clausura."""
+        filas = CategoriaRelacion.objects.filter(
+            descendiente_id__in=ids
+        ).order_by('descendiente_id', '-profundidad').values_list('descendiente_id', 'ancestro__nombre')
+        nombres = {}
+        for descendiente_id, nombre in filas:
+            nombres.setdefault(descendiente_id, []).append(nombre)
+        Categoria.objects.bulk_update(
+            [Categoria(pk=pk, ruta=' > '.join(ruta), nivel=len(ruta) - 1) for pk, ruta in nombres.items()],
+            ['ruta', 'nivel'],
+        )
+
+    @classmethod
+    def reconstruir_arbol(cls):
+        """Regenera la tabla de clausura y las rutas desde `padre` (p. ej. tras cargas por SQL)."""
+        with transaction.atomic():
+            CategoriaRelacion.objects.all().delete()
+            padres = dict(cls.objects.values_list('pk', 'padre_id'))
+            relaciones = []
+            for pk in padres:
+                actual, profundidad, vistos = pk, 0, set()
+                while actual is not None and actual not in vistos:
+                    vistos.add(actual)
+                    relaciones.append(CategoriaRelacion(
+                        ancestro_id=actual, descendiente_id=pk, profundidad=profundidad
+                    ))
+                    actual = padres.get(actual)
+                    profundidad += 1
+            CategoriaRelacion.objects.bulk_create(relaciones, batch_size=1000)
+            cls.actualizar_rutas(list(padres))
+
+    @classmethod
+    def arbol(cls):
+        """
+        Devuelve las categorías raíz con `hijos` y `descendientes` (preorden)
+        ya resueltos, todo con una sola consulta.
+        """
+        categorias = list(cls.objects.all())
+        por_id = {c.pk: c for c in categorias}
+        raices = []
+        for categoria in categorias:
+            categoria.hijos = []
+        for categoria in categorias:
+            padre = por_id.get(categoria.padre_id)
+            if padre:
+                padre.hijos.append(categoria)
+            else:
+                raices.append(categoria)
+
+        def recorrer(categoria):
+            for hijo in categoria.hijos:
+                yield hijo
+                yield from recorrer(hijo)
+
+        for raiz in raices:
+            raiz.descendientes = list(recorrer(raiz))
+        return raices
+
+
+class CategoriaRelacion(models.Model):
+    """Tabla de clausura del árbol de categorías: un par (ancestro, descendiente) por fila."""
+    ancestro = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='descendientes_rel')
+    descendiente = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='ancestros_rel')
+    profundidad = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Relación de Categoría"
+        verbose_name_plural = "Relaciones de Categoría"
+        unique_together = ('ancestro', 'descendiente')
+        indexes = [models.Index(fields=['descendiente', 'profundidad'])]
+
+    def __str__(self):
+        return f"{self.ancestro_id} → {self.descendiente_id} ({self.profundidad})"
 
 
 class Producto(models.Model):
+    # Código del proveedor: identifica el producto en las importaciones masivas
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # ← Puede ser NULL
+    costo = models.DecimalField(  # Costo de compra (base del margen)
+        max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)]
+    )
     cantidad = models.PositiveIntegerField()
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
+    # Miniaturas generadas por tienda.imagenes (no editar a mano)
+    imagen_rendiciones = models.JSONField(default=dict, blank=True, editable=False)
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='productos')
     categoria = models.ForeignKey(
         'Categoria',
@@ -59,6 +216,14 @@ class Producto(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-created_at']
+        indexes = [
+            # Catálogo del comprador: solo productos visibles con stock, del más nuevo al más viejo
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(visible_para_usuario=True, cantidad__gt=0),
+                name='producto_catalogo_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nombre} (x{self.cantidad}) - S/{self.precio or 'Sin precio'}"
@@ -79,6 +244,8 @@ class Carrito(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
+    # Unidades en el carrito (desnormalizado; lo mantiene tienda.inventario)
+    num_items = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name = "Carrito"
@@ -108,30 +275,12 @@ class ItemCarrito(models.Model):
         verbose_name = "Item del Carrito"
         verbose_name_plural = "Items del Carrito"
         unique_together = ('carrito', 'producto')
+        indexes = [models.Index(fields=['agregado_en'], name='itemcarrito_agregado_idx')]  # limpiar_carritos
 
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
 
-    def save(self, *args, **kwargs):
-        if self.pk:
-            anterior = ItemCarrito.objects.get(pk=self.pk)
-            diff = self.cantidad - anterior.cantidad
-            self._ajustar_stock(diff)
-        else:
-            self._ajustar_stock(self.cantidad)
-        super().save(*args, **kwargs)
-
-    def delete(self, *args, **kwargs):
-        self._ajustar_stock(-self.cantidad)
-        super().delete(*args, **kwargs)
-
-    def _ajustar_stock(self, delta):
-        producto = self.producto
-        nuevo_stock = producto.cantidad - delta
-        if nuevo_stock < 0:
-            raise ValueError(f"No hay suficiente stock para '{producto.nombre}'. Disponible: {producto.cantidad}")
-        producto.cantidad = nuevo_stock
-        producto.save(update_fields=['cantidad'])
+    # El stock se reserva/devuelve en tienda.inventario (UPDATE condicional), no en save()/delete()
 
 
 class Orden(models.Model):
@@ -145,18 +294,27 @@ class Orden(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='completada')
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ordenes_creadas')
+    # Resumen de las líneas (desnormalizado al crear la orden; ver tienda.compras)
+    total_lineas = models.PositiveIntegerField(default=0)
+    total_unidades = models.PositiveIntegerField(default=0)
+    # Evita órdenes duplicadas por doble envío del formulario de compra
+    token_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Orden"
         verbose_name_plural = "Órdenes"
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['usuario', 'estado', '-fecha', '-id'], name='orden_historial_idx'),
+            models.Index(fields=['fecha'], name='orden_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"Orden #{self.id} - {self.usuario.username}"
 
     @property
     def total_items(self):
-        return self.items.aggregate(total=models.Sum('cantidad'))['total'] or 0
+        return self.total_unidades
 
 
 class ItemOrden(models.Model):
@@ -169,6 +327,7 @@ class ItemOrden(models.Model):
     class Meta:
         verbose_name = "Item de Orden"
         verbose_name_plural = "Items de Orden"
+        indexes = [models.Index(fields=['producto_id'], name='itemorden_producto_idx')]
 
     def __str__(self):
         return f"{self.cantidad} x {self.producto_nombre}"
@@ -176,6 +335,37 @@ class ItemOrden(models.Model):
     @property
     def subtotal(self):
         return self.cantidad * self.precio_unitario
+
+
+class VentaDiaria(models.Model):
+    """Resumen de ventas por producto y día; se acumula al confirmar cada compra."""
+    dia = models.DateField()
+    producto_id = models.PositiveIntegerField()
+    producto_nombre = models.CharField(max_length=200)
+    cantidad = models.PositiveIntegerField(default=0)
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ultima_venta = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Venta Diaria"
+        verbose_name_plural = "Ventas Diarias"
+        unique_together = ('dia', 'producto_id')
+
+    def __str__(self):
+        return f"{self.dia} - {self.producto_nombre}: {self.cantidad}"
+
+
+class VersionCatalogo(models.Model):
+    """Fila única con la versión del catálogo: compartida por todos los procesos (ver tienda/catalogo.py)."""
+    version = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Versión del Catálogo"
+        verbose_name_plural = "Versión del Catálogo"
+
+    def __str__(self):
+        return f"Catálogo v{self.version}"
+
     
 class LoginAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
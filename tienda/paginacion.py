@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class PaginaKeyset:
+    """Una página de resultados y los cursores para moverse a la anterior/siguiente."""
+
+    def __init__(self, objetos, cursor_anterior=None, cursor_siguiente=None):
+        self.objetos = objetos
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_otras_paginas(self):
+        return self.tiene_anterior or self.tiene_siguiente
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def tamano_pagina(request, por_defecto=None):
+    """Tamaño de página: ?tamano=N acotado a PAGINACION_TAMANO_MAX."""
+    por_defecto = por_defecto or getattr(settings, 'PAGINACION_TAMANO', 24)
+    maximo = getattr(settings, 'PAGINACION_TAMANO_MAX', 100)
+    try:
+        tamano = int(request.GET.get('tamano', por_defecto))
+    except (TypeError, ValueError):
+        tamano = por_defecto
+    return max(1, min(tamano, maximo))
+
+
+def paginar_keyset(queryset, request, orden=('-created_at', '-id'), tamano=None):
+    """
+    Pagina `queryset` por keyset (sin OFFSET) siguiendo `orden`.
+
+    El cursor viaja en ?despues=... (página siguiente) o ?antes=... (anterior) y
+    contiene los valores de `orden` del último/primer elemento de la página.
+    El último campo de `orden` debe ser único (normalmente el id).
+    """
+    tamano = tamano or tamano_pagina(request)
+    despues = _decodificar(queryset.model, orden, request.GET.get('despues'))
+    antes = _decodificar(queryset.model, orden, request.GET.get('antes'))
+
+    if antes is not None:
+        orden_inverso = [c[1:] if c.startswith('-') else f'-{c}' for c in orden]
+        filas = list(queryset.filter(_condicion(orden, antes, hacia_atras=True))
+                     .order_by(*orden_inverso)[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        return PaginaKeyset(
+            filas,
+            cursor_anterior=_codificar(orden, filas[0]) if hay_mas else None,
+            cursor_siguiente=_codificar(orden, filas[-1]) if filas else None,
+        )
+
+    if despues is not None:
+        queryset = queryset.filter(_condicion(orden, despues, hacia_atras=False))
+    filas = list(queryset.order_by(*orden)[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    return PaginaKeyset(
+        filas,
+        cursor_anterior=_codificar(orden, filas[0]) if despues is not None and filas else None,
+        cursor_siguiente=_codificar(orden, filas[-1]) if hay_mas else None,
+    )
+
+
+def _condicion(orden, valores, hacia_atras):
+    # (a, b, c) "después de" (x, y, z) ⇔ a<x  OR  a=x AND b<y  OR  a=x AND b=y AND c<z
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        descendente = campo.startswith('-')
+        operador = 'lt' if descendente != hacia_atras else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+def _valor(objeto, nombre):
+    if isinstance(objeto, dict):
+        return objeto[nombre]
+    return getattr(objeto, nombre)
+
+
+def _serializable(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()  # Conserva microsegundos (DjangoJSONEncoder los trunca)
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _codificar(orden, objeto):
+    valores = [_serializable(_valor(objeto, c.lstrip('-'))) for c in orden]
+    datos = json.dumps(valores, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def _decodificar(modelo, orden, cursor):
+    if not cursor:
+        return None
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(datos)
+    except ValueError:
+        return None
+    if not isinstance(valores, list) or len(valores) != len(orden):
+        return None
+    resultado = []
+    for campo, valor in zip(orden, valores):
+        try:
+            field = modelo._meta.get_field(campo.lstrip('-'))
+        except FieldDoesNotExist:
+            resultado.append(valor)  # Anotación (p. ej. relevancia)
+            continue
+        try:
+            resultado.append(field.to_python(valor))
+        except ValidationError:
+            return None
+    return resultado
@@ -0,0 +1,253 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as hora
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+PLANTILLA_ORDEN = 'pdf/orden_pdf.html'
+
+EMPRESA = {
+    'nombre': 'MultiTiendas S.A.C.',
+    'ruc': '12345678901',
+    'direccion': 'Av. Comercio 123, Lima',
+    'telefono': '+51 987 654 321',
+}
+
+_ultima_purga = 0.0
+_exportaciones = None  # Semáforo de exportaciones simultáneas en este proceso
+
+
+class ErrorPDF(Exception):
+    """xhtml2pdf no pudo generar el documento."""
+
+
+def renderizar_pdf_orden(orden):
+    """Renderiza el comprobante de la orden y devuelve los bytes del PDF."""
+    html = get_template(PLANTILLA_ORDEN).render({
+        'orden': orden,
+        'fecha_hoy': timezone.now().strftime('%d/%m/%Y %H:%M'),
+        'empresa': EMPRESA,
+    })
+    salida = BytesIO()
+    pisa_status = pisa.CreatePDF(BytesIO(html.encode('UTF-8')), dest=salida, encoding='UTF-8')
+    if pisa_status.err:
+        raise ErrorPDF(f"Error al generar el PDF de la orden #{orden.id}")
+    return salida.getvalue()
+
+
+# ===== CACHÉ DE PDFs EN DISCO =====
+
+def directorio_cache():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', settings.BASE_DIR / 'cache' / 'pdf'))
+
+
+def hash_plantilla():
+    plantilla = get_template(PLANTILLA_ORDEN)
+    return hashlib.sha256(plantilla.template.source.encode('utf-8')).hexdigest()[:16]
+
+
+def clave_pdf(orden):
+    """Clave de contenido: cambia si cambia el estado/total de la orden o la plantilla."""
+    datos = f"{orden.id}:{orden.estado}:{orden.total}:{hash_plantilla()}"
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()[:32]
+
+
+def ruta_pdf(orden):
+    return directorio_cache() / f"orden_{orden.id}_{clave_pdf(orden)}.pdf"
+
+
+def obtener_pdf_orden(orden):
+    """Devuelve la ruta del PDF en caché, renderizándolo solo si no existe."""
+    ruta = ruta_pdf(orden)
+    if ruta.exists():
+        return ruta
+
+    contenido = renderizar_pdf_orden(orden)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: nunca se sirve un PDF a medio escribir
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+    # Versiones anteriores de la misma orden (otro estado u otra plantilla)
+    for anterior in ruta.parent.glob(f"orden_{orden.id}_*.pdf"):
+        if anterior != ruta:
+            anterior.unlink(missing_ok=True)
+
+    _purgar_si_toca()
+    return ruta
+
+
+def abrir_pdf_orden(orden):
+    """Abre el PDF en caché (lo regenera si una purga lo borró entre medias)."""
+    try:
+        return open(obtener_pdf_orden(orden), 'rb')
+    except FileNotFoundError:
+        return open(obtener_pdf_orden(orden), 'rb')
+
+
+def purgar_cache(max_bytes=None, max_dias=None):
+    """
+    Borra PDFs más antiguos que `max_dias` y, si la caché sigue superando
+    `max_bytes`, los menos usados recientemente. Devuelve (archivos, bytes) borrados.
+    """
+    max_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', 500 * 1024 * 1024) if max_bytes is None else max_bytes
+    max_dias = getattr(settings, 'PDF_CACHE_MAX_DIAS', 30) if max_dias is None else max_dias
+    directorio = directorio_cache()
+    if not directorio.exists():
+        return 0, 0
+
+    archivos = []
+    for entrada in os.scandir(directorio):
+        if entrada.is_file() and entrada.name.endswith('.pdf'):
+            info = entrada.stat()
+            archivos.append((max(info.st_atime, info.st_mtime), info.st_size, entrada.path))
+
+    limite = time.time() - max_dias * 86400
+    borrados = liberados = 0
+    total = sum(tamano for _, tamano, _ in archivos)
+    for uso, tamano, ruta in sorted(archivos):
+        if uso >= limite and total <= max_bytes:
+            break
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            continue
+        borrados += 1
+        liberados += tamano
+        total -= tamano
+    return borrados, liberados
+
+
+def _purgar_si_toca():
+    global _ultima_purga
+    intervalo = getattr(settings, 'PDF_CACHE_PURGA_SEGUNDOS', 300)
+    if time.time() - _ultima_purga >= intervalo:
+        _ultima_purga = time.time()
+        purgar_cache()
+
+
+# ===== EXPORTACIÓN MASIVA (ZIP) EN UN POOL DE PROCESOS =====
+
+def ordenes_para_exportar(desde=None, hasta=None, usuario=None, estado=None):
+    """Ids de las órdenes que cumplen el filtro (fechas locales inclusivas)."""
+    from .models import Orden
+    ordenes = Orden.objects.all()
+    if desde:
+        ordenes = ordenes.filter(fecha__gte=timezone.make_aware(datetime.combine(desde, hora.min)))
+    if hasta:
+        ordenes = ordenes.filter(fecha__lte=timezone.make_aware(datetime.combine(hasta, hora.max)))
+    if usuario:
+        ordenes = ordenes.filter(usuario__username=usuario)
+    if estado:
+        ordenes = ordenes.filter(estado=estado)
+    return ordenes.order_by('id').values_list('id', flat=True)
+
+
+def _iniciar_proceso(settings_module):
+    # Procesos "spawn": arrancan limpios (sin conexiones a BD heredadas del padre)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _renderizar_en_proceso(orden_id):
+    # Los procesos hijos importan este módulo antes de django.setup(): nada de
+    # modelos a nivel de módulo
+    from .models import Orden
+    try:
+        orden = Orden.objects.select_related('usuario').prefetch_related('items').get(id=orden_id)
+        return orden_id, str(obtener_pdf_orden(orden)), None
+    except Exception as e:  # El error se informa dentro del ZIP, no corta la exportación
+        return orden_id, None, str(e)
+
+
+class _SalidaZip:
+    """Destino no posicionable para ZipFile: acumula bytes hasta que se vacía."""
+
+    def __init__(self):
+        self.datos = bytearray()
+
+    def write(self, datos):
+        self.datos += datos
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = bytes(self.datos)
+        self.datos.clear()
+        return datos
+
+
+def _semaforo_exportaciones():
+    global _exportaciones
+    if _exportaciones is None:
+        _exportaciones = threading.BoundedSemaphore(getattr(settings, 'PDF_EXPORTACIONES_SIMULTANEAS', 1))
+    return _exportaciones
+
+
+def zip_pdfs_ordenes(orden_ids, procesos=None):
+    """
+    Genera (en bloques de bytes) un ZIP con los PDFs de `orden_ids`.
+
+    xhtml2pdf es CPU-bound y no suelta el GIL, así que el renderizado se reparte
+    en un pool de `procesos` procesos (por defecto PDF_PROCESOS, pensado para la
+    vista web; el comando exportar_pdfs usa todos los núcleos). Como mucho
+    `procesos * 4` órdenes están en vuelo a la vez y cada PDF se vuelca al ZIP
+    en cuanto está listo (memoria acotada). Cada pool arranca intérpretes nuevos
+    que importan Django: en un worker web solo corren
+    PDF_EXPORTACIONES_SIMULTANEAS exportaciones a la vez, las demás esperan su
+    turno.
+    """
+    procesos = procesos or getattr(settings, 'PDF_PROCESOS', 2)
+    with _semaforo_exportaciones():
+        yield from _zip_pdfs(orden_ids, procesos)
+
+
+def _zip_pdfs(orden_ids, procesos):
+    salida = _SalidaZip()
+    errores = []
+    pool = ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_iniciar_proceso,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'multi_tiendas.settings'),),
+    )
+    try:
+        with zipfile.ZipFile(salida, 'w', zipfile.ZIP_STORED) as archivo_zip:
+            pendientes = deque()
+            ids = iter(orden_ids)
+            while True:
+                while len(pendientes) < procesos * 4:
+                    orden_id = next(ids, None)
+                    if orden_id is None:
+                        break
+                    pendientes.append(pool.submit(_renderizar_en_proceso, orden_id))
+                if not pendientes:
+                    break
+                orden_id, ruta, error = pendientes.popleft().result()
+                if ruta:
+                    archivo_zip.write(ruta, arcname=f"orden_{orden_id}.pdf")
+                else:
+                    errores.append(f"Orden #{orden_id}: {error}")
+                yield salida.vaciar()
+            if errores:
+                archivo_zip.writestr('errores.txt', '\n'.join(errores))
+        yield salida.vaciar()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
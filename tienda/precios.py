@@ -0,0 +1,158 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .catalogo import invalidar_catalogo
+from .models import Producto
+
+CENTIMO = Decimal('0.01')
+PRECIO_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+REGLAS = {'fijo': 'Precio fijo (S/)', 'margen': 'Margen sobre el costo (%)'}
+
+
+class ResultadoPrecios:
+    def __init__(self, actualizados=0, nuevos_visibles=0, sin_stock=0, omitidos=0):
+        self.actualizados = actualizados
+        self.nuevos_visibles = nuevos_visibles  # Pasaron de ocultos a visibles en el catálogo
+        self.sin_stock = sin_stock  # Visibles, pero sin stock no aparecen aún
+        self.omitidos = omitidos  # Ya tenían precio o ya no existen
+
+
+def _importe(valor, nombre):
+    try:
+        importe = Decimal(str(valor).strip().replace(',', '.')).quantize(CENTIMO, ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        importe = None
+    if importe is None or not importe.is_finite():
+        raise ValidationError(f"'{valor}' no es un {nombre} válido (ej: 24.00).")
+    return importe
+
+
+def limpiar_precio(valor):
+    """Convierte el texto del formulario en un precio válido (> 0, dos decimales); ValidationError si no."""
+    precio = _importe(valor, 'precio')
+    if precio <= 0 or precio > PRECIO_MAXIMO:
+        raise ValidationError(f"El precio debe estar entre 0.01 y {PRECIO_MAXIMO}.")
+    return precio
+
+
+def limpiar_costo(valor):
+    """Como limpiar_precio, pero admite 0 (mismo criterio que Producto.costo: MinValueValidator(0))."""
+    costo = _importe(valor, 'costo')
+    if costo < 0 or costo > PRECIO_MAXIMO:
+        raise ValidationError(f"El costo debe estar entre 0 y {PRECIO_MAXIMO}.")
+    return costo
+
+
+def aplicar_regla(regla, valor, costo):
+    """Precio según la regla: 'fijo' → valor; 'margen' → costo + valor%. None si falta el costo."""
+    if regla == 'fijo':
+        return valor
+    if costo is None:
+        return None
+    precio = (costo * (1 + valor / 100)).quantize(CENTIMO, ROUND_HALF_UP)
+    return precio if 0 < precio <= PRECIO_MAXIMO else None
+
+
+def leer_precios(datos, prefijo='precio_'):
+    """{producto_id: precio} de los campos `precio_<id>` no vacíos del POST, y la lista de errores."""
+    precios, errores = {}, []
+    for clave, valor in datos.items():
+        if not clave.startswith(prefijo) or not valor.strip():
+            continue
+        try:
+            producto_id = int(clave[len(prefijo):])
+            precios[producto_id] = limpiar_precio(valor)
+        except ValueError:
+            continue
+        except ValidationError as e:
+            errores.append(f"Producto {producto_id}: {e.messages[0]}")
+    return precios, errores
+
+
+def leer_reglas(datos):
+    """
+    Reglas del POST: regla_<categoria_id> / valor_<categoria_id> ('0' = sin categoría,
+    'resto' = el resto). Devuelve ({clave: (regla, valor)}, errores).
+    """
+    reglas, errores = {}, []
+    for clave, regla in datos.items():
+        if not clave.startswith('regla_') or regla not in REGLAS:
+            continue
+        grupo = clave[len('regla_'):]
+        texto = datos.get(f'valor_{grupo}', '').strip()
+        try:
+            if regla == 'fijo':
+                valor = limpiar_precio(texto)
+            else:
+                valor = Decimal(texto.replace(',', '.'))
+                if not valor.is_finite() or valor < 0:
+                    raise InvalidOperation
+        except (ValidationError, InvalidOperation):
+            errores.append(f"Valor no válido para la regla «{REGLAS[regla]}»: '{texto}'.")
+            continue
+        reglas[grupo] = (regla, valor)
+    return reglas, errores
+
+
+def precios_por_reglas(reglas, productos):
+    """
+    Aplica las reglas por categoría (con 'resto' como respaldo) a `productos`,
+    iterable de (id, categoria_id, costo). Devuelve ({id: precio}, ids sin costo).
+    """
+    precios, sin_costo = {}, []
+    for producto_id, categoria_id, costo in productos:
+        regla = reglas.get(str(categoria_id or 0)) or reglas.get('resto')
+        if regla is None:
+            continue
+        precio = aplicar_regla(*regla, costo)
+        if precio is None:
+            sin_costo.append(producto_id)
+        else:
+            precios[producto_id] = precio
+    return precios, sin_costo
+
+
+def resumen_sin_precio():
+    """Productos sin precio agrupados por categoría (cuántos y cuántos tienen costo), en una consulta."""
+    return (
+        Producto.objects.filter(precio__isnull=True)
+        .values('categoria_id', 'categoria__ruta')
+        .annotate(productos=Count('id'), con_costo=Count('costo'))
+        .order_by('categoria__ruta')
+    )
+
+
+def asignar_precios(precios, usuario=None, solo_sin_precio=True):
+    """
+    Guarda {producto_id: precio} con un único bulk_update de precio y
+    visible_para_usuario (la misma regla que Producto.save(): visible si tiene
+    precio). Con `solo_sin_precio` se ignoran los que otro administrador ya
+    valoró mientras tanto.
+    """
+    if not precios:
+        return ResultadoPrecios()
+    with transaction.atomic():
+        productos = Producto.objects.select_for_update().filter(id__in=list(precios))
+        if solo_sin_precio:
+            productos = productos.filter(precio__isnull=True)
+        productos = list(productos.only('id', 'precio', 'cantidad', 'visible_para_usuario'))
+        resultado = ResultadoPrecios(actualizados=len(productos), omitidos=len(precios) - len(productos))
+        ahora = timezone.now()
+        for producto in productos:
+            producto.precio = precios[producto.id]
+            visible = producto.precio is not None
+            if visible and not producto.visible_para_usuario:
+                resultado.nuevos_visibles += 1
+                resultado.sin_stock += producto.cantidad == 0
+            producto.visible_para_usuario = visible
+            producto.updated_by = usuario
+            producto.updated_at = ahora  # bulk_update no aplica auto_now
+        Producto.objects.bulk_update(
+            productos, ['precio', 'visible_para_usuario', 'updated_by', 'updated_at']
+        )
+        invalidar_catalogo()
+    return resultado
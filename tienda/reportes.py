@@ -0,0 +1,166 @@
+import csv
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import CharField, DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ItemOrden, Producto, VentaDiaria
+
+
+# ===== RESUMEN DIARIO (ESCRITURA) =====
+
+def registrar_ventas(orden, items):
+    """
+    Acumula las líneas de `orden` en VentaDiaria con un único
+    INSERT ... ON CONFLICT (dia, producto_id) DO UPDATE.
+    """
+    acumulado = defaultdict(lambda: [None, 0, Decimal('0.00')])
+    for item in items:
+        fila = acumulado[item.producto_id]
+        fila[0] = item.producto_nombre
+        fila[1] += item.cantidad
+        fila[2] += item.subtotal
+    if not acumulado:
+        return
+
+    ops = connection.ops
+    dia = ops.adapt_datefield_value(timezone.localdate(orden.fecha))
+    fecha = ops.adapt_datetimefield_value(orden.fecha)
+    valores = []
+    for producto_id, (nombre, cantidad, importe) in acumulado.items():
+        valores += [dia, producto_id, nombre, cantidad, ops.adapt_decimalfield_value(importe, 14, 2), fecha]
+
+    tabla = connection.ops.quote_name(VentaDiaria._meta.db_table)
+    filas = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(acumulado))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (dia, producto_id, producto_nombre, cantidad, importe, ultima_venta) "
+            f"VALUES {filas} "
+            f"ON CONFLICT (dia, producto_id) DO UPDATE SET "
+            f"cantidad = {tabla}.cantidad + excluded.cantidad, "
+            f"importe = {tabla}.importe + excluded.importe, "
+            f"producto_nombre = excluded.producto_nombre, "
+            f"ultima_venta = CASE WHEN excluded.ultima_venta > {tabla}.ultima_venta "
+            f"THEN excluded.ultima_venta ELSE {tabla}.ultima_venta END",
+            valores,
+        )
+
+
+def reconstruir_ventas_diarias():
+    """Regenera VentaDiaria desde ItemOrden con un GROUP BY (producto, día)."""
+    filas = ItemOrden.objects.annotate(dia=TruncDate('orden__fecha')).values('dia', 'producto_id').annotate(
+        nombre=Max('producto_nombre'),
+        total_cantidad=Sum('cantidad'),
+        total_importe=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField()),
+        ultima=Max('orden__fecha'),
+    ).order_by()
+    with transaction.atomic():
+        VentaDiaria.objects.all().delete()
+        VentaDiaria.objects.bulk_create((
+            VentaDiaria(
+                dia=f['dia'],
+                producto_id=f['producto_id'],
+                producto_nombre=f['nombre'],
+                cantidad=f['total_cantidad'],
+                importe=f['total_importe'],
+                ultima_venta=f['ultima'],
+            ) for f in filas.iterator(chunk_size=2000)
+        ), batch_size=1000)
+    return VentaDiaria.objects.count()
+
+
+# ===== RESUMEN DE PRODUCTOS VENDIDOS (LECTURA) =====
+
+def rango_fechas(params):
+    """
+    Lee ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (o ?fecha= para un solo día).
+    Devuelve (desde, hasta); lanza ValueError si el formato es inválido.
+    """
+    fecha = params.get('fecha')
+    desde = params.get('desde') or fecha
+    hasta = params.get('hasta') or fecha
+    desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+    hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+    return desde, hasta
+
+
+def resumen_ventas(desde=None, hasta=None):
+    """
+    Resumen por producto (un solo GROUP BY sobre VentaDiaria).
+    Cada fila trae nombre, categoria, tipo, cantidad_total, importe_total y ultima_venta.
+    """
+    ventas = VentaDiaria.objects.all()
+    if desde:
+        ventas = ventas.filter(dia__gte=desde)
+    if hasta:
+        ventas = ventas.filter(dia__lte=hasta)
+
+    producto = Producto.objects.filter(id=OuterRef('producto_id')).order_by()
+    return ventas.values('producto_id').annotate(
+        nombre=Max('producto_nombre'),
+        cantidad_total=Sum('cantidad'),
+        importe_total=Sum('importe'),
+        ultima_venta=Max('ultima_venta'),
+        categoria=Coalesce(Subquery(producto.values('categoria__nombre')[:1]), Value(''), output_field=CharField()),
+        tipo=Coalesce(Subquery(producto.values('categoria__padre__nombre')[:1]), Value(''), output_field=CharField()),
+    ).order_by('nombre', 'producto_id')
+
+
+def precio_promedio(fila):
+    if not fila['cantidad_total']:
+        return Decimal('0.00')
+    return (fila['importe_total'] / fila['cantidad_total']).quantize(Decimal('0.01'))
+
+
+# ===== EXPORTACIÓN CSV EN STREAMING =====
+
+CABECERA_CSV = ['Producto', 'Categoría', 'Tipo', 'Cantidad Total', 'Precio Unitario', 'Importe Total', 'Última Venta']
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv_ventas(filas, tamano_bloque=64 * 1024):
+    """
+    Genera el CSV del resumen en bloques de ~`tamano_bloque` bytes.
+    `filas` debe ser un iterador (p. ej. resumen_ventas(...).iterator()) para no
+    cargar todo el resultado en memoria.
+    """
+    writer = csv.writer(_Eco())
+    bloque = [writer.writerow(CABECERA_CSV)]
+    tamano = 0
+    for fila in filas:
+        linea = writer.writerow([
+            fila['nombre'],
+            fila['categoria'],
+            fila['tipo'],
+            fila['cantidad_total'],
+            f"S/ {precio_promedio(fila)}",
+            f"S/ {fila['importe_total']:.2f}",
+            timezone.localtime(fila['ultima_venta']).strftime('%Y-%m-%d') if fila['ultima_venta'] else '',
+        ])
+        bloque.append(linea)
+        tamano += len(linea)
+        if tamano >= tamano_bloque:
+            yield ''.join(bloque).encode('utf-8')
+            bloque, tamano = [], 0
+    if bloque:
+        yield ''.join(bloque).encode('utf-8')
+
+
+def comprimir_gzip(bloques, nivel=6):
+    """Comprime al vuelo una secuencia de bloques de bytes (formato gzip)."""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
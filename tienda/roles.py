@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.cache import cache
+
+ADMINISTRADOR = 'Administrador'
+ALMACENERO = 'Almacenero'
+
+
+def _clave(user_id):
+    return f'tienda:roles:{user_id}'
+
+
+def roles(user):
+    """
+    Nombres de los grupos del usuario. Se resuelven una vez por petición
+    (memo en el propio objeto user) y se guardan en la caché hasta que
+    invalidar_roles() los descarta.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    memo = getattr(user, '_roles_tienda', None)
+    if memo is not None:
+        return memo
+
+    memo = cache.get(_clave(user.pk))
+    if memo is None:
+        memo = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(_clave(user.pk), memo, getattr(settings, 'ROLES_CACHE_SEGUNDOS', 3600))
+    user._roles_tienda = memo
+    return memo
+
+
+def invalidar_roles(*user_ids):
+    """Descarta los roles en caché (llamar tras cambiar los grupos de un usuario)."""
+    cache.delete_many([_clave(user_id) for user_id in user_ids])
+
+
+def es_admin(user):
+    return user.is_superuser or ADMINISTRADOR in roles(user)
+
+
+def es_almacenero(user):
+    return ALMACENERO in roles(user)
\ No newline at end of file
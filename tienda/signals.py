@@ -0,0 +1,50 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalogo import invalidar_catalogo
+from .models import Categoria, CategoriaRelacion, Producto
+from .roles import invalidar_roles
+
+
+@receiver(pre_delete, sender=Categoria)
+def desprender_subcategorias(sender, instance, **kwargs):
+    # Las subcategorías quedan como raíz (padre → SET_NULL): se cortan sus
+    # relaciones con los ancestros de la categoría borrada y se recalculan sus rutas.
+    descendientes = list(
+        CategoriaRelacion.objects.filter(ancestro=instance, profundidad__gt=0).values_list('descendiente_id', flat=True)
+    )
+    if not descendientes:
+        return
+    CategoriaRelacion.objects.filter(
+        descendiente_id__in=descendientes,
+        ancestro_id__in=CategoriaRelacion.objects.filter(descendiente=instance).values('ancestro_id'),
+    ).delete()
+    Categoria.actualizar_rutas(descendientes)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_catalogo_al_guardar(sender, **kwargs):
+    # Las operaciones masivas (bulk_create/bulk_update/update) no emiten señales:
+    # quien las hace llama a invalidar_catalogo() directamente
+    invalidar_catalogo()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_roles_al_cambiar_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cambios hechos fuera de las vistas de tienda (p. ej. desde /django-admin/)
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear(): en post_clear ya no se sabe a quién afectó
+        invalidar_roles(*instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            invalidar_roles(*(pk_set or ()))
+        else:
+            invalidar_roles(instance.pk)
+
+@receiver(pre_delete, sender=Group)
+def invalidar_roles_del_grupo(sender, instance, **kwargs):
+    invalidar_roles(*instance.user_set.values_list('pk', flat=True))
@@ -0,0 +1,40 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from ..imagenes import rendiciones_vigentes
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagen_producto(producto, rendicion='card', sizes=None, **atributos):
+    """
+    <picture> con srcset WebP/JPEG de las rendiciones del producto.
+    Uso: {% imagen_producto producto 'thumb' style="width: 50px" %}
+    Mientras no existan las rendiciones, se usa la imagen original.
+    """
+    tamanos = rendiciones_vigentes(producto)
+    atributos.setdefault('alt', producto.nombre)
+    atributos.setdefault('loading', 'lazy')
+    atributos.setdefault('decoding', 'async')
+    if rendicion not in tamanos:
+        return format_html('<img src="{}"{}>', producto.imagen.url, flatatt(atributos))
+
+    if sizes is None:
+        sizes = f"{tamanos[rendicion]['ancho']}px"
+    # Para miniaturas basta la propia y la siguiente (pantallas 2x), no la de 1200px
+    candidatas = sorted({t['ancho']: t for t in tamanos.values()}.values(), key=lambda t: t['ancho'])
+    if rendicion == 'thumb':
+        candidatas = candidatas[:2]
+
+    def srcset(formato):
+        return ', '.join(f"{default_storage.url(t[formato])} {t['ancho']}w" for t in candidatas)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        srcset('webp'), sizes,
+        default_storage.url(tamanos[rendicion]['jpeg']), srcset('jpeg'), sizes, flatatt(atributos),
+    )
\ No newline at end of file
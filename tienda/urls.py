@@ -44,17 +44,24 @@ urlpatterns = [
     # Almacenero
     path('almacenero/', views.dashboard_almacenero, name='dashboard_almacenero'),
     path('almacenero/agregar/', views.agregar_producto_almacenero, name='agregar_producto_almacenero'),
+    path('almacenero/importar/', views.importar_productos_almacenero, name='importar_productos_almacenero'),
     path('almacenero/editar/<int:producto_id>/', views.editar_producto_almacenero, name='editar_producto_almacenero'),
 
     # Administrador
     path('admin/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/productos-sin-precio/', views.admin_productos_sin_precio, name='admin_productos_sin_precio'),
     path('admin/asignar-precio/<int:producto_id>/', views.admin_asignar_precio, name='admin_asignar_precio'),
+    path('admin/precios-masivos/', views.admin_precios_masivos, name='admin_precios_masivos'),
     path('admin/productos-vendidos/', views.admin_productos_vendidos, name='admin_productos_vendidos'),
     path('admin/gestion-usuarios/', views.admin_gestion_usuarios, name='admin_gestion_usuarios'),
     path('admin/crear-usuario/', views.admin_crear_usuario, name='admin_crear_usuario'),
     path('admin/desactivar/<int:user_id>/', views.admin_desactivar_usuario, name='admin_desactivar_usuario'),
     path('admin/actualizar-rol/<int:user_id>/', views.admin_actualizar_rol, name='admin_actualizar_rol'),
     path('admin/exportar-csv/', views.admin_exportar_csv, name='admin_exportar_csv'),
+    path('admin/exportar-pdfs/', views.admin_exportar_pdfs, name='admin_exportar_pdfs'),
+    path('admin/rendimiento/', views.admin_rendimiento, name='admin_rendimiento'),
+
+    # API pública de solo lectura
+    path('api/catalogo/', views.api_catalogo, name='api_catalogo'),
 
  ]
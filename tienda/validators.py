@@ -1,6 +1,7 @@
 # tienda/validators.py
 import re
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class PasswordStrengthValidator:
@@ -42,4 +43,13 @@ class PasswordStrengthValidator:
             )
 
     def get_help_text(self):
-        return self.help_text
\ No newline at end of file
+        return self.help_text
+
+
+def validar_fecha_vencimiento(fecha):
+    """Regla compartida por ProductoForm y la importación masiva: nada vencido entra al almacén."""
+    if fecha and fecha < timezone.now().date():
+        raise ValidationError(
+            _("La fecha de vencimiento no puede ser anterior al día de hoy."),
+            code='fecha_vencida'
+        )
@@ -1,32 +1,42 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db import transaction
-from django.utils import timezone
-from django.http import HttpResponse, JsonResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from io import BytesIO
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from django.utils.cache import patch_vary_headers
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from decimal import Decimal
-from django.db.models import Q
 from .forms import LoginForm, RegistroForm, AdminCrearUsuarioForm
-from .models import Producto, Categoria, Carrito, ItemCarrito, Orden, ItemOrden
+from .models import Producto, Categoria, Carrito, ItemCarrito, Orden
 from django.contrib.auth.models import User, Group
-import csv
-from .models import LoginAttempt
+from .limitador import ip_cliente, obtener_limitador
+from .middleware import estadisticas_rendimiento, estadisticas_sesion
+from .api import ErrorConsulta, cuerpo_catalogo, parametros_catalogo
+from .busqueda import buscar_productos
+from .catalogo import MARCADOR_CSRF, fragmento, insertar_csrf, version_catalogo
+from .condicional import etag_api_catalogo, etag_catalogo, etag_detalle_orden, etag_pdf_orden
+from .imagenes import programar_rendiciones
+from .importacion import ErrorImportacion, importar_productos
+from .roles import es_admin, es_almacenero, invalidar_roles
+from .paginacion import PaginaKeyset, paginar_keyset, tamano_pagina
+from .precios import REGLAS, asignar_precios, leer_precios, leer_reglas, precios_por_reglas, resumen_sin_precio
+from . import compras
+from .compras import importe_items, nuevo_token
+from .inventario import agregar_item, quitar_item
+from .pdf import ErrorPDF, abrir_pdf_orden, ordenes_para_exportar, zip_pdfs_ordenes
+from .reportes import (
+    comprimir_gzip, lineas_csv_ventas, precio_promedio, rango_fechas, resumen_ventas,
+)
 #from tienda import models
-from django.db.models import Q
 
 
 
 # ===== DECORADORES DE ROL =====
-def es_almacenero(user):
-    return user.groups.filter(name='Almacenero').exists()
-
-
-def es_admin(user):
-    return user.groups.filter(name='Administrador').exists() or user.is_superuser
+# ✅ es_admin / es_almacenero resuelven los grupos desde caché (ver tienda/roles.py)
 
 
 # ===== VISTAS DE AUTENTICACIÓN =====
@@ -38,20 +48,19 @@ def login_view(request):
 
     if request.method == 'POST':
         form = LoginForm(data=request.POST)  # ✅ Solo data=..., sin 'request'
-        username = request.POST.get('username')
-
-        # Verificar bloqueo por intentos fallidos
-        if username:
-            try:
-                user = User.objects.get(username=username)
-                attempt, _ = LoginAttempt.objects.get_or_create(user=user)
-                
-                if attempt.is_blocked():
-                    tiempo_restante = (attempt.blocked_until - timezone.now()).total_seconds() // 60
-                    messages.error(request, f"🔒 Tu cuenta está bloqueada por {int(tiempo_restante)} minutos por múltiples intentos fallidos.")
-                    return render(request, 'login.html', {'form': form})
-            except User.DoesNotExist:
-                pass  # Usuario no existe → manejar como error normal
+        username = request.POST.get('username', '')
+        ip = ip_cliente(request)
+        limitador = obtener_limitador()
+
+        # ✅ Bloqueo por intentos fallidos: se comprueba antes de buscar al usuario o verificar la contraseña
+        segundos, por_ip = limitador.bloqueo(username, ip)
+        if segundos:
+            minutos = max(1, segundos // 60)
+            if por_ip:
+                messages.error(request, f"🔒 Demasiados intentos fallidos desde tu red. Intenta de nuevo en {minutos} minutos.")
+            else:
+                messages.error(request, f"🔒 Tu cuenta está bloqueada por {minutos} minutos por múltiples intentos fallidos.")
+            return render(request, 'login.html', {'form': form})
 
         # Procesar formulario
         if form.is_valid():
@@ -60,35 +69,20 @@ def login_view(request):
             user = authenticate(request, username=username, password=password)
 
             if user is not None:
-                # Verificar bloqueo antes de login
-                attempt, _ = LoginAttempt.objects.get_or_create(user=user)
-                if attempt.is_blocked():
-                    tiempo_restante = (attempt.blocked_until - timezone.now()).total_seconds() // 60
-                    messages.error(request, f"🔒 Tu cuenta está bloqueada por {int(tiempo_restante)} minutos.")
-                    return render(request, 'login.html', {'form': form})
-
                 # Login exitoso → resetear intentos
-                LoginAttempt.objects.filter(user=user).update(attempts=0, blocked_until=None)
+                limitador.registrar_exito(username, ip)
                 auth_login(request, user)
                 messages.success(request, f"¡Bienvenido, {user.username}!")
                 return redirect('dashboard')
+
+            # Intento fallido → registrar
+            restantes = limitador.registrar_fallo(username, ip)
+            if restantes == 0:
+                messages.error(request, f"🔒 Demasiados intentos fallidos. Tu cuenta está bloqueada por {limitador.duracion_bloqueo // 60} minutos.")
+            elif restantes is not None:
+                messages.error(request, f"Usuario o contraseña incorrectos. Te quedan {restantes} intentos.")
             else:
-                # Intento fallido → registrar
-                if username:
-                    try:
-                        user = User.objects.get(username=username)
-                        attempt, _ = LoginAttempt.objects.get_or_create(user=user)
-                        attempt.add_attempt()
-                        
-                        if attempt.is_blocked():
-                            messages.error(request, "🔒 Demasiados intentos fallidos. Tu cuenta está bloqueada por 2 horas.")
-                        else:
-                            mensajes_restantes = 5 - attempt.attempts
-                            messages.error(request, f"Usuario o contraseña incorrectos. Te quedan {mensajes_restantes} intentos.")
-                    except User.DoesNotExist:
-                        messages.error(request, "Usuario o contraseña incorrectos.")
-                else:
-                    messages.error(request, "Por favor, ingresa un usuario.")
+                messages.error(request, "Usuario o contraseña incorrectos.")
         else:
             messages.error(request, "Por favor, corrige los errores del formulario.")
 
@@ -147,6 +141,8 @@ def logout_view(request):
 # ===== VISTA DE DASHBOARD (CON REDIRECCIÓN AUTOMÁTICA POR ROL) =====
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_catalogo)
 def dashboard_view(request):
     # ✅ Solo redirigir si NO hay parámetros de búsqueda/filtro
     if not request.GET:
@@ -159,37 +155,62 @@ def dashboard_view(request):
     q = request.GET.get('q', '').strip()
     categoria_id = request.GET.get('categoria')
 
-    productos = Producto.objects.filter(
-        cantidad__gt=0,
-        visible_para_usuario=True
-    )
+    # Grilla y menús se cachean ya renderizados por versión del catálogo: un acierto
+    # no toca el ORM ni las plantillas. Lo propio del usuario (token CSRF, carrito,
+    # nombre) queda fuera de los fragmentos.
+    version = version_catalogo(request)
 
-    # Búsqueda
-    if q:
-        productos = productos.filter(
-            Q(nombre__icontains=q) | Q(descripcion__icontains=q)
+    def grilla():
+        productos = Producto.objects.filter(
+            cantidad__gt=0,
+            visible_para_usuario=True
         )
 
-    # Filtro por categoría
-    if categoria_id:
-        try:
-            categoria = Categoria.objects.get(id=categoria_id)
-            if categoria.subcategorias.exists():
-                productos = productos.filter(categoria__in=categoria.subcategorias.all())
-            else:
-                productos = productos.filter(categoria_id=categoria_id)
-        except Categoria.DoesNotExist:
-            pass
+        # Búsqueda (índice de texto completo, ordenada por relevancia)
+        if q:
+            productos = buscar_productos(productos, q)
 
-    productos = productos.order_by('-created_at')
-    categorias = Categoria.objects.filter(padre__isnull=True)
+        # Filtro por categoría (incluye todo el subárbol, a cualquier profundidad)
+        if categoria_id and categoria_id.isdigit():
+            productos = productos.filter(categoria_id__in=Categoria.ids_subarbol(categoria_id))
+
+        if q:
+            pagina = paginar_keyset(productos, request, orden=('-relevancia', '-created_at', '-id'))
+        else:
+            pagina = paginar_keyset(productos, request)
+        html = render_to_string('dashboard_productos.html', {
+            'productos': pagina.objetos,
+            'categoria_seleccionada': categoria_id,
+            'q': q,
+            'campo_csrf': MARCADOR_CSRF,
+        })
+        return html, pagina.cursor_anterior, pagina.cursor_siguiente
+
+    def menus():
+        categorias = Categoria.arbol()
+        return (
+            render_to_string('dashboard_categorias.html', {'categorias': categorias}),
+            render_to_string('dashboard_filtro_categorias.html', {
+                'categorias': categorias, 'categoria_seleccionada': categoria_id,
+            }),
+        )
+
+    productos_html, cursor_anterior, cursor_siguiente = fragmento(
+        version, 'productos',
+        (q, categoria_id, request.GET.get('despues'), request.GET.get('antes'), tamano_pagina(request)),
+        grilla,
+    )
+    menu_categorias, opciones_categoria = fragmento(version, 'categorias', (categoria_id,), menus)
 
     return render(request, 'dashboard.html', {
-        'productos': productos,
-        'categorias': categorias,
+        'productos_html': insertar_csrf(productos_html, request),
+        'pagina': PaginaKeyset([], cursor_anterior, cursor_siguiente),
+        'menu_categorias': mark_safe(menu_categorias),
+        'opciones_categoria': mark_safe(opciones_categoria),
         'categoria_seleccionada': categoria_id,
         'q': q,
     })
+
 # ===== VISTAS DE USUARIO (ROL: USUARIO) =====
 
 @login_required
@@ -215,16 +236,8 @@ def agregar_al_carrito(request, producto_id):
             messages.error(request, f"Solo hay {producto.cantidad} unidades disponibles.")
             return redirect('dashboard')
         try:
-            with transaction.atomic():
-                item, creado = ItemCarrito.objects.get_or_create(
-                    carrito=carrito,
-                    producto=producto,
-                    defaults={'cantidad': cantidad}
-                )
-                if not creado:
-                    item.cantidad += cantidad
-                    item.save()
-                messages.success(request, f"✅ {producto.nombre} añadido al carrito.")
+            agregar_item(carrito, producto, cantidad)
+            messages.success(request, f"✅ {producto.nombre} añadido al carrito.")
         except ValueError as e:
             messages.error(request, str(e))
         except Exception as e:
@@ -235,18 +248,17 @@ def agregar_al_carrito(request, producto_id):
 
 @login_required
 def quitar_del_carrito(request, item_id):
-    item = get_object_or_404(ItemCarrito, id=item_id, carrito__usuario=request.user)
+    item = get_object_or_404(ItemCarrito.objects.select_related('producto'), id=item_id, carrito__usuario=request.user)
 
     if request.method == "POST":
         try:
-            with transaction.atomic():
-                producto_nombre = item.producto.nombre
-                cantidad_quitada = item.cantidad
-                item.delete()
+            if quitar_item(item):
                 messages.success(
                     request,
-                    f"❌ {cantidad_quitada}x {producto_nombre} eliminado(s) del carrito."
+                    f"❌ {item.cantidad}x {item.producto.nombre} eliminado(s) del carrito."
                 )
+            else:
+                messages.warning(request, "El carrito cambió mientras lo editabas. Revísalo e inténtalo de nuevo.")
         except Exception as e:
             messages.error(request, "Error al quitar del carrito.")
 
@@ -256,99 +268,72 @@ def quitar_del_carrito(request, item_id):
 @login_required
 def ver_carrito(request):
     carrito = obtener_o_crear_carrito(request)
-    items = carrito.items.select_related('producto').all()
+    items = list(carrito.items.select_related('producto'))
     return render(request, 'carrito.html', {
         'carrito': carrito,
         'items': items,
+        'total': importe_items(items),
+        'token_compra': nuevo_token(),
     })
 
 
 @login_required
 def procesar_compra(request):
-    carrito = obtener_o_crear_carrito(request)
-    items = carrito.items.select_related('producto').all()
-
-    if not items:
-        messages.error(request, "Tu carrito está vacío.")
+    if request.method != 'POST':
         return redirect('ver_carrito')
 
+    # ✅ Un mismo token (doble clic, reintento) nunca genera dos órdenes
+    token = request.POST.get('token_compra', '')[:64] or None
     try:
-        with transaction.atomic():
-            total = carrito.total_precio
-            orden = Orden.objects.create(
-                usuario=request.user,
-                total=total,
-                created_by=request.user,
-                estado='completada'
-            )
-
-            item_ordenes = []
-            for item in items:
-                item_ordenes.append(
-                    ItemOrden(
-                        orden=orden,
-                        producto_nombre=item.producto.nombre,
-                        producto_id=item.producto.id,
-                        cantidad=item.cantidad,
-                        precio_unitario=item.producto.precio
-                    )
-                )
-            ItemOrden.objects.bulk_create(item_ordenes)
-
-            carrito.items.all().delete()
-
-            messages.success(request, f"✅ ¡Compra realizada! Orden #{orden.id} generada.")
-            return redirect('detalle_orden', orden_id=orden.id)
-
+        orden, creada = compras.procesar_compra(request.user, token)
+    except compras.CarritoVacio:
+        messages.error(request, "Tu carrito está vacío.")
+        return redirect('ver_carrito')
     except Exception as e:
         messages.error(request, f"Error al procesar la compra: {str(e)}")
         return redirect('ver_carrito')
 
+    if creada:
+        messages.success(request, f"✅ ¡Compra realizada! Orden #{orden.id} generada.")
+    return redirect('detalle_orden', orden_id=orden.id)
+
 
 @login_required
 def historial_compras(request):
+    # ✅ Una página = una consulta (índice orden_historial_idx); los totales ya vienen en la orden
     ordenes = Orden.objects.filter(
         usuario=request.user,
         estado='completada'
-    ).prefetch_related('items')
-    return render(request, 'historial.html', {'ordenes': ordenes})
+    ).only('id', 'fecha', 'total', 'total_unidades')
+    pagina = paginar_keyset(ordenes, request, orden=('-fecha', '-id'))
+    return render(request, 'historial.html', {'ordenes': pagina.objetos, 'pagina': pagina})
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_detalle_orden)
 def detalle_orden(request, orden_id):
     orden = get_object_or_404(Orden, id=orden_id, usuario=request.user)
     return render(request, 'detalle_orden.html', {'orden': orden})
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_pdf_orden)
 def generar_pdf_orden(request, orden_id):
-    orden = get_object_or_404(Orden, id=orden_id, usuario=request.user)
-
-    template = get_template('pdf/orden_pdf.html')
-    context = {
-        'orden': orden,
-        'fecha_hoy': timezone.now().strftime('%d/%m/%Y %H:%M'),
-        'empresa': {
-            'nombre': 'MultiTiendas S.A.C.',
-            'ruc': '12345678901',
-            'direccion': 'Av. Comercio 123, Lima',
-            'telefono': '+51 987 654 321',
-        }
-    }
-    html = template.render(context)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="orden_{orden.id}.pdf"'
-
-    pisa_status = pisa.CreatePDF(
-        BytesIO(html.encode('UTF-8')),
-        dest=response,
-        encoding='UTF-8'
-    )
+    orden = get_object_or_404(Orden.objects.select_related('usuario'), id=orden_id, usuario=request.user)
 
-    if pisa_status.err:
+    # ✅ Las órdenes no cambian: se sirve el PDF ya renderizado si existe
+    try:
+        archivo = abrir_pdf_orden(orden)
+    except ErrorPDF:
         return HttpResponse('Error al generar PDF', status=400)
-    return response
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"orden_{orden.id}.pdf",
+        content_type='application/pdf',
+    )
 
 
 # ===== VISTAS DE ALMACENERO =====
@@ -356,8 +341,9 @@ def generar_pdf_orden(request, orden_id):
 @login_required
 @user_passes_test(es_almacenero)
 def dashboard_almacenero(request):
-    productos = Producto.objects.all().order_by('-created_at')
-    return render(request, 'almacenero/dashboard.html', {'productos': productos})
+    productos = Producto.objects.select_related('categoria__padre')
+    pagina = paginar_keyset(productos, request)
+    return render(request, 'almacenero/dashboard.html', {'productos': pagina.objetos, 'pagina': pagina})
 
 
 @login_required
@@ -371,6 +357,8 @@ def agregar_producto_almacenero(request):
             producto.usuario = request.user
             producto.created_by = request.user
             producto.save()
+            if producto.imagen:
+                programar_rendiciones(producto)
             messages.success(request, f"✅ Producto '{producto.nombre}' agregado al almacén.")
             return redirect('dashboard_almacenero')
     else:
@@ -378,6 +366,34 @@ def agregar_producto_almacenero(request):
     return render(request, 'almacenero/agregar_producto.html', {'form': form})
 
 
+@login_required
+@user_passes_test(es_almacenero)
+def importar_productos_almacenero(request):
+    from .forms import ImportarProductosForm
+    resultado = None
+    if request.method == "POST":
+        form = ImportarProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                resultado = importar_productos(
+                    form.cleaned_data['archivo'],
+                    request.user,
+                    imagenes=form.cleaned_data['imagenes'],
+                    reemplazar_stock=form.cleaned_data['reemplazar_stock'],
+                )
+            except ErrorImportacion as e:
+                form.add_error('archivo', str(e))
+            else:
+                resumen = f"{resultado.creados} producto(s) creado(s) y {resultado.actualizados} actualizado(s)"
+                if resultado.errores:
+                    messages.warning(request, f"⚠️ {resumen}; {len(resultado.errores)} fila(s) con errores.")
+                else:
+                    messages.success(request, f"✅ {resumen}.")
+    else:
+        form = ImportarProductosForm()
+    return render(request, 'almacenero/importar_productos.html', {'form': form, 'resultado': resultado})
+
+
 @login_required
 @user_passes_test(es_almacenero)
 def editar_producto_almacenero(request, producto_id):
@@ -389,6 +405,8 @@ def editar_producto_almacenero(request, producto_id):
             producto = form.save(commit=False)
             producto.updated_by = request.user
             producto.save()
+            if 'imagen' in form.changed_data:
+                programar_rendiciones(producto)
             messages.success(request, "✅ Producto actualizado.")
             return redirect('dashboard_almacenero')
     else:
@@ -401,10 +419,14 @@ def editar_producto_almacenero(request, producto_id):
 @login_required
 @user_passes_test(es_admin)
 def admin_dashboard(request):
-    productos = Producto.objects.filter(precio__isnull=False, visible_para_usuario=True).order_by('-created_at')
+    productos = Producto.objects.filter(
+        precio__isnull=False, visible_para_usuario=True
+    ).select_related('categoria__padre')
+    pagina = paginar_keyset(productos, request)
     categorias = Categoria.objects.filter(padre__isnull=True)
     return render(request, 'admin/dashboard.html', {
-        'productos': productos,
+        'productos': pagina.objetos,
+        'pagina': pagina,
         'categorias': categorias,
     })
 
@@ -412,7 +434,7 @@ def admin_dashboard(request):
 @login_required
 @user_passes_test(es_admin)
 def admin_productos_sin_precio(request):
-    productos = Producto.objects.filter(precio__isnull=True).order_by('-created_at')
+    productos = Producto.objects.filter(precio__isnull=True).select_related('categoria__padre').order_by('-created_at')
     return render(request, 'admin/productos_sin_precio.html', {'productos': productos})
 
 
@@ -434,67 +456,67 @@ def admin_asignar_precio(request, producto_id):
 
 @login_required
 @user_passes_test(es_admin)
-def admin_productos_vendidos(request):
-    fecha = request.GET.get('fecha')
-    items = ItemOrden.objects.select_related('orden__usuario', 'orden')
-
-    if fecha:
-        try:
-            from datetime import datetime
-            fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-            items = items.filter(orden__fecha__date=fecha_obj)
-        except ValueError:
-            messages.error(request, "Formato de fecha inválido. Usa YYYY-MM-DD")
-            fecha = None
-
-    from collections import defaultdict
-    from decimal import Decimal
-    resumen = defaultdict(lambda: {
-        'cantidad_total': 0,
-        'importe_total': Decimal('0.00'),
-        'ultima_venta': None,
-        'categoria': '',
-        'tipo': ''
+def admin_precios_masivos(request):
+    if request.method == "POST":
+        if request.POST.get('accion') == 'reglas':
+            reglas, errores = leer_reglas(request.POST)
+            # Con una regla mal escrita no se aplica ninguna: sus productos caerían en "resto"
+            precios, sin_costo = precios_por_reglas(
+                reglas, Producto.objects.filter(precio__isnull=True).values_list('id', 'categoria_id', 'costo')
+            ) if reglas and not errores else ({}, [])
+            if sin_costo:
+                errores.append(f"{len(sin_costo)} producto(s) sin costo registrado: no se les aplicó el margen.")
+        else:
+            precios, errores = leer_precios(request.POST)
+        for error in errores:
+            messages.error(request, f"⚠️ {error}")
+        if precios:
+            resultado = asignar_precios(precios, request.user)
+            messages.success(
+                request,
+                f"✅ Precio asignado a {resultado.actualizados} producto(s); "
+                f"{resultado.nuevos_visibles} ahora visible(s) para los compradores"
+                + (f" ({resultado.sin_stock} sin stock)" if resultado.sin_stock else "") + "."
+            )
+            if resultado.omitidos:
+                messages.warning(request, f"⚠️ {resultado.omitidos} producto(s) ya tenían precio (o ya no existen) y no se modificaron.")
+        elif not errores:
+            messages.info(request, "No se indicó ningún precio ni regla.")
+        return redirect(request.get_full_path())
+
+    productos = Producto.objects.filter(precio__isnull=True).select_related('categoria').only(
+        'id', 'sku', 'nombre', 'costo', 'cantidad', 'created_at', 'categoria__ruta'
+    )
+    pagina = paginar_keyset(productos, request, tamano=getattr(settings, 'PRECIOS_POR_PAGINA', 200))
+    return render(request, 'admin/precios_masivos.html', {
+        'productos': pagina.objetos,
+        'pagina': pagina,
+        'grupos': resumen_sin_precio(),
+        'reglas': REGLAS,
     })
 
-    for item in items:
-        key = item.producto_nombre
-        resumen[key]['cantidad_total'] += item.cantidad
-        resumen[key]['importe_total'] += item.subtotal
-        
-        # ✅ Usa item.producto_id (NO item.producto)
-        try:
-            producto_original = Producto.objects.get(id=item.producto_id)
-            if producto_original.categoria:
-                resumen[key]['categoria'] = producto_original.categoria.nombre
-                if producto_original.categoria.padre:
-                    resumen[key]['tipo'] = producto_original.categoria.padre.nombre
-        except Producto.DoesNotExist:
-            # Producto eliminado → dejar campos vacíos
-            pass
-
-        if not resumen[key]['ultima_venta'] or item.orden.fecha > resumen[key]['ultima_venta']:
-            resumen[key]['ultima_venta'] = item.orden.fecha
-
-    resumen_list = [
-        {
-            'nombre': nombre,
-            'categoria': data['categoria'],
-            'tipo': data['tipo'],
-            'cantidad_total': data['cantidad_total'],
-            'precio_unitario': item.precio_unitario,  # ✅ Ya está en ItemOrden
-            'importe_total': data['importe_total'],
-            'ultima_venta': data['ultima_venta']
-        }
-        for nombre, data in resumen.items()
-    ]
+
+@login_required
+@user_passes_test(es_admin)
+def admin_productos_vendidos(request):
+    try:
+        desde, hasta = rango_fechas(request.GET)
+    except ValueError:
+        messages.error(request, "Formato de fecha inválido. Usa YYYY-MM-DD")
+        desde = hasta = None
+
+    # ✅ Un solo GROUP BY sobre el resumen diario (VentaDiaria)
+    resumen_list = list(resumen_ventas(desde, hasta))
+    for fila in resumen_list:
+        fila['precio_unitario'] = precio_promedio(fila)
 
     total_cantidad = sum(item['cantidad_total'] for item in resumen_list)
     total_importe = sum(item['importe_total'] for item in resumen_list)
 
     return render(request, 'admin/productos_vendidos.html', {
         'items': resumen_list,
-        'fecha': fecha,
+        'desde': desde,
+        'hasta': hasta,
         'total_cantidad': total_cantidad,
         'total_importe': total_importe
     })
@@ -529,6 +551,7 @@ def admin_crear_usuario(request):
                 )
                 grupo, _ = Group.objects.get_or_create(name=rol)
                 user.groups.add(grupo)
+                invalidar_roles(user.id)
                 messages.success(request, f"✅ Usuario '{username}' creado como {rol}.")
                 return redirect('admin_gestion_usuarios')
             except Exception as e:
@@ -547,6 +570,7 @@ def admin_desactivar_usuario(request, user_id):
     else:
         user.is_active = False
         user.save()
+        invalidar_roles(user.id)
         messages.success(request, f"✅ Usuario '{user.username}' desactivado.")
     return redirect('admin_gestion_usuarios')
 
@@ -563,12 +587,40 @@ def admin_actualizar_rol(request, user_id):
             user.groups.clear()
             grupo, _ = Group.objects.get_or_create(name=rol)
             user.groups.add(grupo)
+            invalidar_roles(user.id)
             return JsonResponse({'success': True})
         else:
             return JsonResponse({'success': False, 'error': 'Rol inválido'})
     return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
 
 
+# ===== API DE CATÁLOGO (JSON, SOLO LECTURA) =====
+
+@require_safe
+@cache_control(public=True, max_age=getattr(settings, 'CATALOGO_API_MAX_AGE', 60))
+@condition(etag_func=etag_api_catalogo)
+def api_catalogo(request):
+    """
+    Productos visibles con stock: ?campos=id,nombre,... &categoria=<id> (con
+    subcategorías) &q=<texto> &despues=/antes=<cursor> &tamano=N.
+    """
+    try:
+        parametros_catalogo(request)
+    except ErrorConsulta as e:
+        return JsonResponse({'error': str(e)}, status=400, json_dumps_params={'ensure_ascii': False})
+
+    cuerpo, comprimido = cuerpo_catalogo(request)
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(comprimido, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        # Otra codificación del mismo recurso: ETag débil (igual que GZipMiddleware)
+        response['ETag'] = f'W/"{etag_api_catalogo(request)}"'
+    else:
+        response = HttpResponse(cuerpo, content_type='application/json')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
 # ===== PERFIL =====
 @login_required
 def mi_perfil(request):
@@ -578,69 +630,54 @@ def mi_perfil(request):
 @login_required
 @user_passes_test(es_admin)
 def admin_exportar_csv(request):
-    """Exporta productos vendidos a CSV"""
-    fecha = request.GET.get('fecha')
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="productos_vendidos.csv"'
-
-    writer = csv.writer(response)
-    # Cabecera
-    writer.writerow([
-        'Producto',
-        'Categoría',
-        'Tipo',
-        'Cantidad Total',
-        'Precio Unitario',
-        'Importe Total',
-        'Última Venta'
-    ])
-
-    # Obtener los mismos datos que en admin_productos_vendidos
-    items_query = ItemOrden.objects.select_related('orden')
-    if fecha:
-        from datetime import datetime
-        try:
-            fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-            items_query = items_query.filter(orden__fecha__date=fecha_obj)
-        except:
-            pass
-
-    # Agrupar (igual que en la vista principal)
-    from collections import defaultdict
-    from decimal import Decimal
-    resumen = defaultdict(lambda: {
-        'cantidad_total': 0,
-        'importe_total': Decimal('0.00'),
-        'ultima_venta': None,
-        'categoria': '',
-        'tipo': ''
-    })
+    """Exporta productos vendidos a CSV (en streaming; ?gzip=1 para comprimir)"""
+    try:
+        desde, hasta = rango_fechas(request.GET)
+    except ValueError:
+        desde = hasta = None
+
+    # ✅ Cursor del lado del servidor: memoria constante sin importar el número de filas
+    filas = resumen_ventas(desde, hasta).iterator(chunk_size=2000)
+    contenido = lineas_csv_ventas(filas)
+    nombre = 'productos_vendidos.csv'
+    tipo = 'text/csv'
+    if request.GET.get('gzip') == '1':
+        contenido = comprimir_gzip(contenido)
+        nombre += '.gz'
+        tipo = 'application/gzip'
+
+    response = StreamingHttpResponse(contenido, content_type=tipo)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
 
-    for item in items_query:
-        key = item.producto_nombre
-        resumen[key]['cantidad_total'] += item.cantidad
-        resumen[key]['importe_total'] += item.subtotal
-        if not resumen[key]['ultima_venta'] or item.orden.fecha > resumen[key]['ultima_venta']:
-            resumen[key]['ultima_venta'] = item.orden.fecha
-            try:
-                producto_original = Producto.objects.get(id=item.producto_id)
-                if producto_original.categoria:
-                    resumen[key]['categoria'] = producto_original.categoria.nombre
-                    if producto_original.categoria.padre:
-                        resumen[key]['tipo'] = producto_original.categoria.padre.nombre
-            except:
-                pass
-
-    # Escribir filas
-    for nombre, data in resumen.items():
-        writer.writerow([
-            nombre,
-            data['categoria'],
-            data['tipo'],
-            data['cantidad_total'],
-            f"S/ {data.get('precio_unitario', 0)}",
-            f"S/ {data['importe_total']}",
-            data['ultima_venta'].strftime('%Y-%m-%d') if data['ultima_venta'] else ''
-        ])
-
-    return response
\ No newline at end of file
+
+
+@login_required
+@user_passes_test(es_admin)
+def admin_exportar_pdfs(request):
+    """Descarga un ZIP con los PDFs de las órdenes filtradas (?desde, ?hasta, ?usuario, ?estado)"""
+    try:
+        desde, hasta = rango_fechas(request.GET)
+    except ValueError:
+        messages.error(request, "Formato de fecha inválido. Usa YYYY-MM-DD")
+        return redirect('admin_productos_vendidos')
+
+    orden_ids = ordenes_para_exportar(
+        desde, hasta,
+        usuario=request.GET.get('usuario') or None,
+        estado=request.GET.get('estado') or None,
+    ).iterator(chunk_size=2000)
+    response = StreamingHttpResponse(zip_pdfs_ordenes(orden_ids), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="ordenes_pdf.zip"'
+    return response
+
+
+@login_required
+@user_passes_test(es_admin)
+def admin_rendimiento(request):
+    """p50/p95/p99 por URL medidos por InstrumentacionMiddleware (en este proceso)"""
+    return JsonResponse({
+        'instrumentacion_activa': getattr(settings, 'INSTRUMENTACION', False),
+        'vistas': estadisticas_rendimiento(),
+        'sesiones': estadisticas_sesion(),
+    }, json_dumps_params={'ensure_ascii': False, 'indent': 2})
\ No newline at end of file